@@ -1,50 +1,23 @@
+import argparse
 import datetime
-import time
 import logging
 from zoneinfo import ZoneInfo
-import pandas_market_calendars as mcal
 
 from ib_insync import IB
-from config import StrategyConfig
+from config import build_strategy_configs
 from utils import setup_logging, create_error_handler
 from execution import (
     ensure_connection,
-    get_available_funds,
     cancel_all_open_orders,
-    get_net_liquidation_value,
 )
 from data import get_sp500_symbols, get_all_us_symbols
-from scanner import run_daily_buy_scan, monitor_open_positions
-
-
-def _is_market_holiday(target_date):
-    """
-    Extracted check to verify if the stock market is officially closed.
-    """
-    nyse = mcal.get_calendar("NYSE")
-    schedule = nyse.schedule(start_date=target_date, end_date=target_date)
-    return schedule.empty
-
-
-def _is_market_open():
-    """
-    Extracted market hours validation.
-    Converts current time to US/Eastern to handle Daylight Saving Time automatically,
-    then checks if it's a weekday between 9:30 AM and 4:00 PM EST.
-    """
-    now_est = datetime.datetime.now(ZoneInfo("US/Eastern"))
-
-    # 5 = Saturday, 6 = Sunday
-    if now_est.weekday() >= 5:
-        return False
-
-    if _is_market_holiday(now_est.date()):
-        return False
-
-    market_open = datetime.time(9, 30)
-    market_close = datetime.time(16, 0)
-
-    return market_open <= now_est.time() <= market_close
+from runner import StrategyRunner
+from kernels import log_kernel_backend
+from profiling import install_profile_signal
+from clock import get_clock, now_est as current_time_est
+from market_hours import is_market_open, is_approaching_close, handle_daily_reset
+from async_loop import run_async_main_loop
+from replay import run_replay
 
 
 def _wait_for_market_open(ib):
@@ -52,7 +25,7 @@ def _wait_for_market_open(ib):
     Extracted sleep logic to pause the bot while the market is closed.
     Returns True if the market is open, False if it is sleeping.
     """
-    if not _is_market_open():
+    if not is_market_open():
         logging.info("Market is currently closed. Sleeping for 60 seconds...")
         # Keep the connection alive but do nothing else
         ib.sleep(60)
@@ -60,112 +33,153 @@ def _wait_for_market_open(ib):
     return True
 
 
-def _is_approaching_close():
+def _run_trading_cycle(ib, runner, scan_state):
     """
-    Extracted check for the final 5 minutes of the trading session.
-    (3:55 PM to 4:00 PM EST)
+    ‼️ NEW: Extracted the core trading cycle into its own function.
+    Clearly separates Priority 1 (Risk Management) from Priority 2 (Scanning).
+    The runner monitors every hosted strategy before fanning a shared scan
+    chunk out to all of them.
     """
-    now_est = datetime.datetime.now(ZoneInfo("US/Eastern"))
-    market_close_warning = datetime.time(15, 55)
-    market_close = datetime.time(16, 0)
-
-    return market_close_warning <= now_est.time() < market_close
+    runner.run_cycle(ib, scan_state, chunk_size=20)
 
 
-def _handle_daily_reset(scan_state, current_equity):
+def _run_main_loop(
+    ib, runner, scan_state, load_symbols=get_all_us_symbols, should_continue=None
+):
     """
-    Checks if it's a new calendar day and fetches fresh symbols if so.
+    The scheduling loop shared by live trading and historical replay.
+    Runs until should_continue() returns False (forever when omitted).
     """
-    now_date = datetime.datetime.now().date()
+    config = runner.connection_config
 
-    if scan_state["date"] != now_date:
-        logging.info("‼️ NEW DAY DETECTED: Fetching fresh symbols for daily scan...")
+    while should_continue is None or should_continue():
+        try:
+            ensure_connection(ib, config)
 
-        if current_equity:
-            logging.info(f"📊 Daily Starting Equity: ${current_equity:,.2f}")
+            if not _wait_for_market_open(ib):
+                continue
 
-        scan_state["date"] = now_date
-
-        # scan_state["all_symbols"] = get_sp500_symbols()
-        scan_state["all_symbols"] = get_all_us_symbols()
-        scan_state["remaining_symbols"] = list(scan_state["all_symbols"])
-
-    if not scan_state["remaining_symbols"] and scan_state["all_symbols"]:
-        logging.info("‼️ SCAN COMPLETE: Restarting loop from the beginning...")
-        scan_state["remaining_symbols"] = list(scan_state["all_symbols"])
+            if is_approaching_close():
+                logging.info(
+                    "Approaching market close. Halting scans and clearing open orders."
+                )
+                cancel_all_open_orders(ib)
+
+                # Sleep for exactly enough time to push us past the closing bell
+                # This prevents the bot from spamming the cancel function for 5 minutes
+                now_est = current_time_est()
+                target_close_time = datetime.datetime.combine(
+                    now_est.date(),
+                    datetime.time(16, 1),
+                    tzinfo=ZoneInfo("US/Eastern"),
+                )
 
+                seconds_until_close = (target_close_time - now_est).total_seconds()
+
+                ib.sleep(max(10, seconds_until_close))
+                continue
+
+            current_equity = runner.refresh_account_capital(ib)
+
+            handle_daily_reset(scan_state, current_equity, load_symbols)
+            _run_trading_cycle(ib, runner, scan_state)
+
+        except Exception as e:
+            logging.error(f"‼️ Connection or execution error encountered: {e}")
+            logging.info("Cleaning up connection state and retrying in 60 seconds...")
+
+            if ib.isConnected():
+                ib.disconnect()
+
+            get_clock().sleep(60)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Paper Trading Bot")
+    parser.add_argument(
+        "--replay",
+        nargs=2,
+        metavar=("START", "END"),
+        help="Replay the live loop over past sessions, e.g. --replay 2024-01-02 2024-03-28",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0,
+        help="Replay speed as a multiple of real time (0 = as fast as possible)",
+    )
+    parser.add_argument(
+        "--symbols",
+        default=None,
+        help="Comma-separated replay universe (defaults to every cached symbol)",
+    )
+    parser.add_argument(
+        "--replay-cache",
+        default="replay_cache",
+        help="Directory holding daily bars for replay",
+    )
+    parser.add_argument(
+        "--replay-fetch",
+        action="store_true",
+        help="Connect to TWS first and cache any missing --symbols for replay",
+    )
+    parser.add_argument(
+        "--sync-loop",
+        action="store_true",
+        help="Run the single-threaded polling loop instead of the asyncio tasks",
+    )
+    return parser.parse_args()
+
+
+def _run_replay_mode(args):
+    setup_logging("replay.log")
+    log_kernel_backend()
+
+    runner = StrategyRunner(build_strategy_configs())
+    live_ib = None
+    if args.replay_fetch:
+        live_ib = IB()
+        ensure_connection(live_ib, runner.connection_config)
 
-def _run_trading_cycle(ib, config, scan_state):
-    """
-    ‼️ NEW: Extracted the core trading cycle into its own function.
-    Clearly separates Priority 1 (Risk Management) from Priority 2 (Scanning).
-    """
-    # Priority 1 - ALWAYS monitor open positions first to ensure quick exits
-    monitor_open_positions(ib, config)
+    try:
+        run_replay(
+            runner,
+            start=datetime.date.fromisoformat(args.replay[0]),
+            end=datetime.date.fromisoformat(args.replay[1]),
+            speed=args.speed,
+            symbols=args.symbols.split(",") if args.symbols else None,
+            cache_dir=args.replay_cache,
+            live_ib=live_ib,
+            main_loop=_run_main_loop if args.sync_loop else run_async_main_loop,
+        )
+    finally:
+        if live_ib is not None and live_ib.isConnected():
+            live_ib.disconnect()
 
-    # Priority 2 - Process a small chunk of new buy signals
-    if scan_state["remaining_symbols"]:
-        run_daily_buy_scan(ib, config, scan_state, chunk_size=20)
 
-        # Small delay between chunks to let the IBKR data farm breathe
-        ib.sleep(5)
+def main():
+    args = _parse_args()
 
+    if args.replay:
+        _run_replay_mode(args)
+        return
 
-def main():
     setup_logging()
     logging.info("Starting Paper Trading Bot...")
+    log_kernel_backend()
 
     ib = IB()
     ib.errorEvent += create_error_handler("bad_symbols.txt")
 
-    config = StrategyConfig()
+    runner = StrategyRunner(build_strategy_configs())
+    install_profile_signal(runner.profiler)
     scan_state = {"date": None, "all_symbols": [], "remaining_symbols": []}
 
     try:
-        while True:
-            try:
-                ensure_connection(ib, config)
-
-                if not _wait_for_market_open(ib):
-                    continue
-
-                if _is_approaching_close():
-                    logging.info(
-                        "Approaching market close. Halting scans and clearing open orders."
-                    )
-                    cancel_all_open_orders(ib)
-
-                    # Sleep for exactly enough time to push us past the closing bell
-                    # This prevents the bot from spamming the cancel function for 5 minutes
-                    now_est = datetime.datetime.now(ZoneInfo("US/Eastern"))
-                    target_close_time = datetime.datetime.combine(
-                        now_est.date(),
-                        datetime.time(16, 1),
-                        tzinfo=ZoneInfo("US/Eastern"),
-                    )
-
-                    seconds_until_close = (target_close_time - now_est).total_seconds()
-
-                    ib.sleep(max(10, seconds_until_close))
-                    continue
-
-                current_equity = get_net_liquidation_value(ib)
-                if current_equity:
-                    config.account_capital = current_equity
-
-                _handle_daily_reset(scan_state, current_equity)
-                _run_trading_cycle(ib, config, scan_state)
-
-            except Exception as e:
-                logging.error(f"‼️ Connection or execution error encountered: {e}")
-                logging.info(
-                    "Cleaning up connection state and retrying in 60 seconds..."
-                )
-
-                if ib.isConnected():
-                    ib.disconnect()
-
-                time.sleep(60)
+        if args.sync_loop:
+            _run_main_loop(ib, runner, scan_state)
+        else:
+            run_async_main_loop(ib, runner, scan_state)
 
     except KeyboardInterrupt:
         logging.info("Manually stopped the trading bot.")
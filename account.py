@@ -1,7 +1,154 @@
 import sys
+import time
 import logging
 
 
+# One AccountState per account id (None = the connection's default account)
+_ACCOUNT_STATES = {}
+
+
+class AccountState:
+    """
+    Subscription-backed snapshot of one account's values, indexed by
+    (tag, currency). The broker pushes changes through accountValueEvent,
+    so reads are a dict lookup instead of a scan of ib.accountValues().
+    """
+
+    def __init__(self, account=None):
+        self.account = account
+        # Concrete account id the snapshot is filtered on, resolved at attach()
+        self.account_id = account
+        self._values = {}
+        self._by_tag = {}
+        self._updated_at = None
+        self._ib = None
+        self._subscribed = False
+
+    def attach(self, ib):
+        """
+        Subscribes once per connection. The default account is already
+        streamed by ib_insync after connect; named accounts need their own
+        multi-account subscription.
+        """
+        if self._ib is not ib:
+            ib.accountValueEvent += self._on_account_value
+            ib.disconnectedEvent += self._on_disconnected
+            self._ib = ib
+
+        if self._subscribed or not ib.isConnected():
+            return
+
+        if self.account:
+            ib.reqAccountUpdatesMulti(self.account)
+        else:
+            self.account_id = self._default_account(ib)
+        self._seed(ib)
+        self._subscribed = True
+
+    @staticmethod
+    def _default_account(ib):
+        """
+        The account ib_insync streams when none is named: the first managed
+        account, which is the only one on a single-account login.
+        """
+        accounts = ib.managedAccounts()
+        if not accounts:
+            raise ConnectionError("No accounts found. Is the broker fully initialized?")
+        return accounts[0]
+
+    def _seed(self, ib):
+        for value in ib.accountValues(self.account_id):
+            self._store(value)
+
+    def _on_account_value(self, value):
+        # Until attach() resolves the default account, nothing is accepted
+        if not self.account_id or value.account != self.account_id:
+            return
+        if value.modelCode:
+            return
+        self._store(value)
+
+    def _on_disconnected(self):
+        self._subscribed = False
+
+    def _store(self, value):
+        self._values[(value.tag, value.currency)] = value.value
+        self._by_tag[value.tag] = value.value
+        self._updated_at = time.monotonic()
+
+    @property
+    def age_seconds(self):
+        if self._updated_at is None:
+            return None
+        return time.monotonic() - self._updated_at
+
+    @property
+    def is_stale(self):
+        """
+        True when the stream feeding the snapshot is gone. Account values can
+        legitimately go unchanged for hours, so the age alone says nothing.
+        """
+        return (
+            not self._subscribed
+            or self._ib is None
+            or not self._ib.isConnected()
+            or self._updated_at is None
+        )
+
+    def refresh_if_stale(self, ib):
+        """
+        Re-subscribes after the connection dropped (or before any value has
+        arrived), e.g. when the socket reconnected behind our back.
+        """
+        if not self.is_stale:
+            return
+
+        logging.warning(
+            f"Account snapshot for {self.account_id or 'default account'} is stale. Re-subscribing..."
+        )
+        self._subscribed = False
+        if not self.account and ib.isConnected():
+            ib.reqAccountUpdates()
+        self.attach(ib)
+
+    def get(self, tag, currency="USD"):
+        return self._values.get((tag, currency))
+
+    def get_float(self, tag, currency="USD"):
+        value = self.get(tag, currency)
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    @property
+    def net_liquidation(self):
+        return self.get_float("NetLiquidation")
+
+    @property
+    def available_funds(self):
+        return self.get_float("AvailableFunds")
+
+    @property
+    def account_type(self):
+        # Reported without a currency, so look it up by tag alone
+        return self._by_tag.get("AccountType")
+
+
+def get_account_state(ib, account=None):
+    """
+    Returns the shared, subscribed snapshot for an account, creating it on
+    first use.
+    """
+    state = _ACCOUNT_STATES.get(account)
+    if state is None:
+        state = AccountState(account)
+        _ACCOUNT_STATES[account] = state
+
+    state.attach(ib)
+    return state
+
+
 def _abort_security_check(message):
     """
     Extracted the critical failure state to ensure consistent
@@ -35,13 +182,7 @@ def verify_cash_account(ib):
     """
     Ensures we are running on a strict Cash account to prevent borrowing/margin.
     """
-    account_values = ib.accountValues()
-    account_type = None
-
-    for val in account_values:
-        if val.tag == "AccountType":
-            account_type = val.value
-            break
+    account_type = get_account_state(ib).account_type
 
     if not account_type:
 
@@ -0,0 +1,348 @@
+import datetime
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# One flat file per column; every symbol's rows live somewhere in each file
+# at the same row offsets. Dates are stored as days since the Unix epoch.
+COLUMN_DTYPES = {
+    "day": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+}
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+def _to_days(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy("datetime64[D]").astype(np.int64)
+
+
+# Mirrors the calendar-based durationStr units IBKR accepts for daily bars
+_DURATION_UNITS = {
+    "D": lambda n: pd.DateOffset(days=n),
+    "W": lambda n: pd.DateOffset(weeks=n),
+    "M": lambda n: pd.DateOffset(months=n),
+    "Y": lambda n: pd.DateOffset(years=n),
+}
+
+
+def duration_start(end_date, duration_str):
+    """First calendar date covered by an IBKR durationStr ending at end_date."""
+    amount, unit = duration_str.split()
+    offset = _DURATION_UNITS[unit.upper()](int(amount))
+    return (pd.Timestamp(end_date) - offset).date()
+
+
+class BarArchive:
+    """
+    Append-only, memory-mapped columnar store of daily OHLCV for the whole
+    universe, with a symbol -> [(offset, length), ...] extent index.
+
+    - read() returns a np.memmap view whenever a symbol is stored as a single
+      extent (always true after compact()). read_frame() copies the requested
+      window into a DataFrame, since the indicator chain works on pandas.
+    - stage() buffers a symbol's new bars in memory and flush() appends every
+      staged row with one sequential write per column file, then atomically
+      replaces the index. A crash mid-flush leaves the old index pointing at
+      intact data.
+    """
+
+    def __init__(self, path, max_extents_per_symbol=8):
+        self.path = path
+        self.max_extents_per_symbol = max_extents_per_symbol
+        os.makedirs(path, exist_ok=True)
+
+        self._rows = 0
+        self._generation = 0
+        self._extents = {}
+        self._maps = {}
+        self._mapped_rows = 0
+        self._staged = {}
+        # Symbols whose staged bars supersede everything already on disk
+        self._replaced = set()
+        # Earliest day a full-lookback download has covered, per symbol
+        self._covered = {}
+        self._load_index()
+
+    # --- index ----------------------------------------------------------
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, "index.json")
+
+    def _column_path(self, column, generation=None):
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.path, f"{column}.{generation}.bin")
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "r") as f:
+            index = json.load(f)
+        self._rows = index["rows"]
+        self._generation = index["generation"]
+        self._extents = {sym: [tuple(e) for e in ext] for sym, ext in index["symbols"].items()}
+        self._covered = {
+            sym: datetime.date.fromisoformat(day) for sym, day in index.get("covered", {}).items()
+        }
+
+    def _write_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "rows": self._rows,
+                    "generation": self._generation,
+                    "symbols": self._extents,
+                    "covered": {sym: day.isoformat() for sym, day in self._covered.items()},
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._index_path)
+
+    def symbols(self):
+        return sorted(set(self._extents) | set(self._staged))
+
+    def __contains__(self, symbol):
+        return symbol in self._extents or symbol in self._staged
+
+    # --- reads ----------------------------------------------------------
+
+    def _column_map(self, column):
+        """Memory-maps a column file, remapping only after the file has grown."""
+        if self._mapped_rows != self._rows:
+            self._maps.clear()
+            self._mapped_rows = self._rows
+
+        if column not in self._maps:
+            if self._rows == 0:
+                return np.empty(0, dtype=COLUMN_DTYPES[column])
+            self._maps[column] = np.memmap(
+                self._column_path(column),
+                dtype=COLUMN_DTYPES[column],
+                mode="r",
+                shape=(self._rows,),
+            )
+        return self._maps[column]
+
+    def read(self, symbol, column):
+        """
+        Returns a symbol's column as a NumPy array. Zero-copy when the symbol
+        is a single extent with nothing staged; otherwise the extents are
+        concatenated.
+        """
+        mapped = self._column_map(column)
+        extents = [] if symbol in self._replaced else self._extents.get(symbol, [])
+        parts = [mapped[offset : offset + length] for offset, length in extents]
+
+        staged = self._staged.get(symbol)
+        if staged is not None:
+            parts.append(staged[column])
+
+        if not parts:
+            return np.empty(0, dtype=COLUMN_DTYPES[column])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def last_day(self, symbol):
+        days = self.read(symbol, "day")
+        if len(days) == 0:
+            return None
+        return _EPOCH + datetime.timedelta(days=int(days[-1]))
+
+    def covered_from(self, symbol):
+        """
+        Earliest day the archive is known to be complete from. Symbols
+        listed after that day simply have no older bars, so this is not
+        always the first stored day; indexes written before it was tracked
+        fall back to that.
+        """
+        if symbol in self._covered:
+            return self._covered[symbol]
+        days = self.read(symbol, "day")
+        if len(days) == 0:
+            return None
+        return _EPOCH + datetime.timedelta(days=int(days[0]))
+
+    def read_frame(self, symbol, start=None):
+        """
+        Returns a copy of the bars on or after `start` in the util.df(bars)
+        layout (date, open, high, low, close, volume).
+        """
+        days = self.read(symbol, "day")
+        lo = 0
+        if start is not None:
+            lo = int(np.searchsorted(days, (start - _EPOCH).days, side="left"))
+
+        frame = {"date": days[lo:].astype("datetime64[D]")}
+        for column in PRICE_COLUMNS:
+            frame[column] = self.read(symbol, column)[lo:]
+        return pd.DataFrame(frame)
+
+    def differs(self, symbol, df, rtol=1e-4):
+        """
+        True when a bar in `df` for a day that is already stored has other
+        prices than the stored one, e.g. after IBKR back-adjusted a split.
+        """
+        if df is None or df.empty or symbol not in self:
+            return False
+
+        stored_days = self.read(symbol, "day")
+        days = _to_days(df["date"])
+        positions = np.searchsorted(stored_days, days)
+        positions = np.minimum(positions, len(stored_days) - 1)
+        overlap = stored_days[positions] == days
+        if not overlap.any():
+            return False
+
+        for column in ("open", "high", "low", "close"):
+            stored = np.asarray(self.read(symbol, column))[positions[overlap]]
+            fresh = df[column].to_numpy(dtype=np.float64)[overlap]
+            if not np.allclose(stored, fresh, rtol=rtol, atol=0.0):
+                return True
+        return False
+
+    # --- writes ---------------------------------------------------------
+
+    def _rows_from(self, df, days):
+        rows = {"day": days}
+        for column in PRICE_COLUMNS:
+            rows[column] = df[column].to_numpy(dtype=COLUMN_DTYPES[column])
+        return rows
+
+    def replace(self, symbol, df, covered_from=None):
+        """
+        Queues `df` as the symbol's entire history. The old extents stop
+        being read right away and are dropped from the index on flush();
+        their rows are reclaimed by the next compact(). covered_from records
+        the first day the download asked for.
+        """
+        if df is None or df.empty:
+            return
+        self._staged[symbol] = self._rows_from(df, _to_days(df["date"]))
+        self._replaced.add(symbol)
+        if covered_from is not None:
+            self._covered[symbol] = covered_from
+
+    def stage(self, symbol, df):
+        """
+        Queues bars newer than anything already stored for `symbol`.
+        Nothing touches disk until flush().
+        """
+        if df is None or df.empty:
+            return
+
+        days = _to_days(df["date"])
+        last = self.last_day(symbol)
+        if last is not None:
+            newer = days > (last - _EPOCH).days
+            if not newer.any():
+                return
+            df = df[newer]
+            days = days[newer]
+
+        new_rows = self._rows_from(df, days)
+        staged = self._staged.get(symbol)
+        if staged is not None:
+            new_rows = {c: np.concatenate([staged[c], new_rows[c]]) for c in COLUMN_DTYPES}
+        self._staged[symbol] = new_rows
+
+    def flush(self):
+        """
+        Appends all staged bars: one sequential write per column file,
+        followed by a single atomic index update.
+        """
+        if not self._staged:
+            return
+
+        symbols = sorted(self._staged)
+        extents = {sym: list(ext) for sym, ext in self._extents.items()}
+        for symbol in self._replaced:
+            extents[symbol] = []
+        offset = self._rows
+        for symbol in symbols:
+            length = len(self._staged[symbol]["day"])
+            extents.setdefault(symbol, []).append((offset, length))
+            offset += length
+
+        for column, dtype in COLUMN_DTYPES.items():
+            block = np.concatenate([self._staged[s][column] for s in symbols]).astype(dtype)
+            self._write_column(column, self._rows, block)
+
+        self._extents = extents
+        self._rows = offset
+        self._staged.clear()
+        self._replaced.clear()
+        self._write_index()
+
+        if self._is_fragmented():
+            self.compact()
+
+    def _write_column(self, column, at_row, block):
+        path = self._column_path(column)
+        mode = "r+b" if os.path.exists(path) else "wb"
+        itemsize = np.dtype(COLUMN_DTYPES[column]).itemsize
+
+        with open(path, mode) as f:
+            # Drop any tail left by an interrupted flush the index never saw
+            f.seek(at_row * itemsize)
+            f.truncate()
+            f.write(block.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _is_fragmented(self):
+        if not self._extents:
+            return False
+        total = sum(len(extents) for extents in self._extents.values())
+        return total / len(self._extents) > self.max_extents_per_symbol
+
+    def compact(self):
+        """
+        Rewrites every column so each symbol is one contiguous extent again,
+        so read() serves views again after many daily appends. The new files are
+        a fresh generation that only becomes live with the index swap.
+        """
+        self.flush()
+        symbols = sorted(self._extents)
+        new_extents = {}
+        offset = 0
+        for symbol in symbols:
+            length = sum(length for _, length in self._extents[symbol])
+            new_extents[symbol] = [(offset, length)]
+            offset += length
+
+        old_generation = self._generation
+        new_generation = old_generation + 1
+        for column in COLUMN_DTYPES:
+            block = np.concatenate([np.asarray(self.read(s, column)) for s in symbols])
+            with open(self._column_path(column, new_generation), "wb") as f:
+                f.write(block.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._extents = new_extents
+        self._rows = offset
+        self._generation = new_generation
+        self._maps.clear()
+        self._mapped_rows = -1
+        self._write_index()
+
+        # Open memmaps keep the old inodes alive until they are released
+        for column in COLUMN_DTYPES:
+            old_path = self._column_path(column, old_generation)
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        logging.info(f"Compacted bar archive: {len(symbols)} symbols, {offset} rows.")
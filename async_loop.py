@@ -0,0 +1,228 @@
+import asyncio
+import logging
+
+from ib_insync import util
+
+from account import verify_paper_account, verify_cash_account
+from clock import now_est
+from data import get_all_us_symbols
+from execution import cancel_all_open_orders
+from market_hours import is_market_open, is_approaching_close, handle_daily_reset
+
+
+class TradingSession:
+    """
+    State shared by the asyncio main loop's tasks. The connection and
+    session-clock tasks own the two gates; the monitor and scan tasks only
+    run while both are set. Order events reach the fill task through a queue.
+    """
+
+    def __init__(self, ib, runner, scan_state, load_symbols=get_all_us_symbols):
+        self.ib = ib
+        self.runner = runner
+        self.scan_state = scan_state
+        self.load_symbols = load_symbols
+
+        self.connected = asyncio.Event()
+        self.trading = asyncio.Event()
+        self.order_events = asyncio.Queue()
+        self.closed_date = None
+
+    def is_trading(self):
+        return self.connected.is_set() and self.trading.is_set() and self.ib.isConnected()
+
+    async def wait_until_trading(self):
+        while not self.is_trading():
+            await self.connected.wait()
+            await self.trading.wait()
+            # Give the connection task a chance to notice a dropped socket
+            await asyncio.sleep(1)
+
+    def on_fill(self, trade, fill):
+        self.order_events.put_nowait(("fill", trade))
+
+    def on_order_status(self, trade):
+        self.order_events.put_nowait(("status", trade))
+
+
+def _drop_connection(session, e):
+    logging.error(f"‼️ Connection or execution error encountered: {e}")
+    if session.ib.isConnected():
+        session.ib.disconnect()
+
+
+async def connection_task(session, retry_seconds=60):
+    """
+    Owns the broker connection: connects, verifies the account, then waits
+    for a disconnect and starts over. Other tasks just wait on the gate.
+    """
+    ib = session.ib
+    config = session.runner.connection_config
+
+    while True:
+        if ib.isConnected():
+            session.connected.set()
+            await ib.disconnectedEvent
+            logging.warning("Broker connection lost. Pausing monitor and scan tasks...")
+
+        session.connected.clear()
+        try:
+            await ib.connectAsync(config.ib_host, config.ib_port, clientId=config.ib_client_id)
+            logging.info("Successfully connected to Interactive Brokers.")
+
+            verify_paper_account(ib)
+            verify_cash_account(ib)
+        except ConnectionRefusedError:
+            logging.error(
+                f"Connection refused. Is TWS or IB Gateway running? "
+                f"Retrying in {retry_seconds} seconds..."
+            )
+            await asyncio.sleep(retry_seconds)
+        except Exception as e:
+            logging.error(
+                f"Unexpected connection error: {e}. Retrying in {retry_seconds} seconds..."
+            )
+            if ib.isConnected():
+                ib.disconnect()
+            await asyncio.sleep(retry_seconds)
+
+
+async def session_clock_task(session, poll_seconds=15):
+    """
+    Opens and closes the trading gate on market hours, runs the daily reset,
+    and cancels working orders once in the last five minutes of the session.
+    """
+    while True:
+        await session.connected.wait()
+
+        try:
+            if is_market_open() and not is_approaching_close():
+                equity = session.runner.refresh_account_capital(session.ib)
+                symbols = None
+                if session.scan_state["date"] != now_est().date():
+                    # The universe download blocks; fills and stops keep running meanwhile
+                    symbols = await asyncio.to_thread(session.load_symbols)
+                handle_daily_reset(session.scan_state, equity, lambda: symbols)
+                if not session.trading.is_set():
+                    logging.info("Market is open. Starting monitor and scan tasks.")
+                    session.trading.set()
+            else:
+                if session.trading.is_set():
+                    logging.info("Market is closed. Pausing monitor and scan tasks.")
+                session.trading.clear()
+
+                today = now_est().date()
+                if is_approaching_close() and session.closed_date != today:
+                    logging.info(
+                        "Approaching market close. Halting scans and clearing open orders."
+                    )
+                    cancel_all_open_orders(session.ib)
+                    session.closed_date = today
+        except Exception as e:
+            _drop_connection(session, e)
+
+        await asyncio.sleep(poll_seconds)
+
+
+async def monitor_task(session):
+    """Priority 1 (Risk Management), independent of how long scans take."""
+    interval_seconds = session.runner.connection_config.monitor_interval_seconds
+    while True:
+        await session.wait_until_trading()
+        try:
+            await session.runner.monitor_async(session.ib)
+        except Exception as e:
+            _drop_connection(session, e)
+        await asyncio.sleep(interval_seconds)
+
+
+async def scan_task(session, chunk_size=20, pause_seconds=5):
+    """Priority 2 (Scanning), one chunk at a time while the gate is open."""
+    while True:
+        await session.wait_until_trading()
+        try:
+            await session.runner.scan_chunk_async(
+                session.ib,
+                session.scan_state,
+                chunk_size,
+                keep_going=session.is_trading,
+            )
+        except Exception as e:
+            _drop_connection(session, e)
+        # Small delay between chunks to let the IBKR data farm breathe
+        await asyncio.sleep(pause_seconds)
+
+
+async def order_event_task(session):
+    """
+    Handles fills and order status changes off the event queue, so they are
+    processed promptly even while a scan chunk is in progress.
+    """
+    ib = session.ib
+    ib.execDetailsEvent += session.on_fill
+    ib.orderStatusEvent += session.on_order_status
+
+    try:
+        while True:
+            kind, trade = await session.order_events.get()
+            try:
+                if kind == "fill":
+                    session.runner.on_fill(ib, trade)
+                elif trade.orderStatus.status in ("Cancelled", "ApiCancelled", "Inactive"):
+                    logging.info(
+                        f"Order {trade.orderStatus.status}: {trade.order.action} "
+                        f"{trade.order.totalQuantity} {trade.contract.symbol}",
+                        extra={
+                            "event": "order_status",
+                            "symbol": trade.contract.symbol,
+                            "status": trade.orderStatus.status,
+                        },
+                    )
+            except Exception as e:
+                logging.error(f"‼️ Error handling order event for {trade.contract.symbol}: {e}")
+    finally:
+        ib.execDetailsEvent -= session.on_fill
+        ib.orderStatusEvent -= session.on_order_status
+
+
+async def stop_task(should_continue, poll_seconds=60):
+    """Returns once should_continue() turns False, which ends the main loop."""
+    while should_continue():
+        await asyncio.sleep(poll_seconds)
+
+
+async def _run_tasks(session, should_continue=None):
+    tasks = [
+        asyncio.ensure_future(connection_task(session)),
+        asyncio.ensure_future(session_clock_task(session)),
+        asyncio.ensure_future(order_event_task(session)),
+        asyncio.ensure_future(monitor_task(session)),
+        asyncio.ensure_future(scan_task(session)),
+    ]
+    if should_continue is not None:
+        tasks.append(asyncio.ensure_future(stop_task(should_continue)))
+    try:
+        # Only the stop task returns; any other finished task has crashed
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def run_async_main_loop(
+    ib, runner, scan_state, load_symbols=get_all_us_symbols, should_continue=None
+):
+    """
+    Asyncio replacement for the blocking while-loop. Connection, session
+    clock, order events, monitoring and scanning run as separate tasks, so a
+    slow scan or a reconnect wait never holds up exits or fill handling.
+    Runs until should_continue() returns False (forever when omitted).
+    """
+    # The strategy and execution helpers still call ib_insync's blocking API
+    # (qualifyContracts, ib.sleep); nesting lets those run inside a task.
+    util.patchAsyncio()
+    session = TradingSession(ib, runner, scan_state, load_symbols)
+    util.run(_run_tasks(session, should_continue))
@@ -0,0 +1,236 @@
+import collections
+import math
+import os
+import logging
+import pandas as pd
+from ib_insync import util
+
+
+EXCHANGE_TZ = "US/Eastern"
+
+# IBKR barSizeSetting -> pandas resample rule.
+# Every intraday size divides the 9:30 open evenly, so bins line up with IB's own bars.
+RESAMPLE_RULES = {
+    "1 min": "1min",
+    "2 mins": "2min",
+    "3 mins": "3min",
+    "5 mins": "5min",
+    "10 mins": "10min",
+    "15 mins": "15min",
+    "30 mins": "30min",
+    "1 day": "1D",
+}
+
+_AGGREGATIONS = {
+    "open": "first",
+    "high": "max",
+    "low": "min",
+    "close": "last",
+    "volume": "sum",
+    "barCount": "sum",
+    "notional": "sum",
+}
+
+
+def is_intraday_bar_size(bar_size):
+    return bar_size != "1 day"
+
+
+def validate_bar_size(bar_size):
+    if bar_size not in RESAMPLE_RULES:
+        raise ValueError(
+            f"Unsupported bar size '{bar_size}'. Choose one of {list(RESAMPLE_RULES)}."
+        )
+
+
+def _to_exchange_index(df):
+    """
+    Builds a tz-aware exchange-time index so daily bins split on the
+    New York session date rather than UTC.
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(df["date"], utc=True))
+    return index.tz_convert(EXCHANGE_TZ)
+
+
+def resample_bars(minute_df, bar_size):
+    """
+    Builds coarser OHLCV bars from 1-minute bars in a single vectorized
+    resample pass. Output columns match util.df(bars), so the indicator and
+    strategy chain runs unchanged on any bar size.
+    """
+    validate_bar_size(bar_size)
+    if minute_df is None or minute_df.empty:
+        return minute_df
+
+    frame = minute_df.set_index(_to_exchange_index(minute_df))
+    frame = frame[[c for c in _AGGREGATIONS if c != "notional" and c in frame.columns]]
+
+    # Carry VWAP through the resample as notional so it can be re-weighted
+    if "average" in minute_df.columns:
+        frame["notional"] = minute_df["average"].to_numpy() * minute_df["volume"].to_numpy()
+
+    aggregations = {c: _AGGREGATIONS[c] for c in frame.columns}
+    bars = frame.resample(
+        RESAMPLE_RULES[bar_size], label="left", closed="left"
+    ).agg(aggregations)
+
+    # Resample emits empty bins for nights, weekends and holidays
+    bars = bars.dropna(subset=["close"])
+
+    if "notional" in bars.columns:
+        volume = bars["volume"].where(bars["volume"] > 0)
+        bars["average"] = (bars["notional"] / volume).fillna(bars["close"])
+        bars = bars.drop(columns=["notional"])
+
+    if bar_size == "1 day":
+        dates = bars.index.date
+    else:
+        dates = bars.index
+
+    bars = bars.reset_index(drop=True)
+    bars.insert(0, "date", dates)
+    return bars
+
+
+def _duration_since(last_bar_time, lookback_duration, retention_days):
+    """
+    Converts the gap since the newest stored bar into an IBKR durationStr,
+    padded by a minute so the still-forming bar is always re-fetched.
+    """
+    if last_bar_time is None:
+        return lookback_duration
+
+    elapsed = pd.Timestamp.now(tz="UTC") - last_bar_time.tz_convert("UTC")
+    seconds = max(int(elapsed.total_seconds()) + 60, 60)
+
+    # Anything older than the retention window is dropped on merge anyway
+    if seconds > retention_days * 86400:
+        return lookback_duration
+
+    # IBKR only accepts second-based durations up to one day
+    if seconds <= 86400:
+        return f"{seconds} S"
+    return f"{math.ceil(seconds / 86400)} D"
+
+
+class MinuteBarStore:
+    """
+    Local store that only ever holds 1-minute bars. Every other bar size is
+    derived from it, so a symbol costs one incremental broker request per
+    refresh no matter how many bar sizes the hosted strategies use.
+
+    At most max_symbols symbols are held in memory, least recently used
+    first out. An evicted symbol is reloaded from cache_dir when set, and
+    otherwise re-downloaded over the full lookback.
+    """
+
+    def __init__(self, retention_days=10, refresh_seconds=30, cache_dir=None, max_symbols=500):
+        self.retention_days = retention_days
+        self.refresh_seconds = refresh_seconds
+        self.cache_dir = cache_dir
+        self.max_symbols = max_symbols
+        self._bars = collections.OrderedDict()
+        self._last_refresh = {}
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, symbol):
+        return os.path.join(self.cache_dir, f"{symbol.replace(' ', '_')}.pkl")
+
+    def _remember(self, symbol, bars):
+        self._bars[symbol] = bars
+        self._bars.move_to_end(symbol)
+        while len(self._bars) > self.max_symbols:
+            evicted, _ = self._bars.popitem(last=False)
+            # Without its bars the symbol must not look fresh
+            self._last_refresh.pop(evicted, None)
+
+    def get(self, symbol):
+        if symbol in self._bars:
+            self._bars.move_to_end(symbol)
+            return self._bars[symbol]
+
+        if self.cache_dir:
+            path = self._cache_path(symbol)
+            if os.path.exists(path):
+                try:
+                    self._remember(symbol, pd.read_pickle(path))
+                except Exception as e:
+                    logging.error(f"‼️ Discarding unreadable minute cache for {symbol}: {e}")
+        return self._bars.get(symbol)
+
+    def is_fresh(self, symbol):
+        last = self._last_refresh.get(symbol)
+        if last is None:
+            return False
+        return (pd.Timestamp.now(tz="UTC") - last).total_seconds() < self.refresh_seconds
+
+    def request_params(self, symbol, lookback_duration):
+        """
+        Returns the reqHistoricalData keyword arguments needed to bring the
+        symbol up to date, or None when the cached bars are still fresh.
+        """
+        if self.is_fresh(symbol):
+            return None
+
+        stored = self.get(symbol)
+        last_bar_time = None
+        if stored is not None and not stored.empty:
+            last_bar_time = stored["date"].iloc[-1]
+
+        return {
+            "endDateTime": "",
+            "durationStr": _duration_since(
+                last_bar_time, lookback_duration, self.retention_days
+            ),
+            "barSizeSetting": "1 min",
+            "whatToShow": "TRADES",
+            "useRTH": True,
+            # Epoch timestamps come back as UTC-aware datetimes regardless of TWS locale
+            "formatDate": 2,
+        }
+
+    def merge(self, symbol, new_bars):
+        """
+        Appends freshly downloaded bars, replacing the previously partial
+        minute, and trims anything older than the retention window.
+        """
+        self._last_refresh[symbol] = pd.Timestamp.now(tz="UTC")
+        if new_bars is None or new_bars.empty:
+            return self.get(symbol)
+
+        new_bars = new_bars.copy()
+        new_bars["date"] = pd.to_datetime(new_bars["date"], utc=True)
+
+        stored = self.get(symbol)
+        if stored is not None and not stored.empty:
+            merged = pd.concat([stored, new_bars], ignore_index=True)
+            merged = merged.drop_duplicates(subset="date", keep="last")
+        else:
+            merged = new_bars
+
+        merged = merged.sort_values("date")
+        cutoff = merged["date"].iloc[-1] - pd.Timedelta(days=self.retention_days)
+        merged = merged[merged["date"] >= cutoff].reset_index(drop=True)
+
+        self._remember(symbol, merged)
+        if self.cache_dir:
+            merged.to_pickle(self._cache_path(symbol))
+        return merged
+
+    def update(self, ib, contract, lookback_duration):
+        params = self.request_params(contract.symbol, lookback_duration)
+        if params is None:
+            return self.get(contract.symbol)
+
+        bars = ib.reqHistoricalData(contract, **params)
+        return self.merge(contract.symbol, util.df(bars))
+
+    async def update_async(self, ib, contract, lookback_duration):
+        params = self.request_params(contract.symbol, lookback_duration)
+        if params is None:
+            return self.get(contract.symbol)
+
+        bars = await ib.reqHistoricalDataAsync(contract, **params)
+        return self.merge(contract.symbol, util.df(bars))
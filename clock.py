@@ -0,0 +1,58 @@
+import datetime
+import time
+from zoneinfo import ZoneInfo
+
+
+EASTERN = ZoneInfo("US/Eastern")
+
+
+class SystemClock:
+    """Wall-clock time, used for live trading."""
+
+    def now(self):
+        return datetime.datetime.now(EASTERN)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """
+    Clock for historical replay. Time only moves when something sleeps, and
+    each simulated second costs 1/speed real seconds (speed=0 never waits).
+    """
+
+    def __init__(self, start, end, speed=0):
+        self._now = start
+        self.end = end
+        self.speed = speed
+
+    def now(self):
+        return self._now
+
+    def sleep(self, seconds):
+        seconds = max(float(seconds), 0.0)
+        self._now += datetime.timedelta(seconds=seconds)
+        if self.speed > 0:
+            time.sleep(seconds / self.speed)
+
+    @property
+    def finished(self):
+        return self._now >= self.end
+
+
+_CLOCK = SystemClock()
+
+
+def get_clock():
+    return _CLOCK
+
+
+def set_clock(clock):
+    global _CLOCK
+    _CLOCK = clock
+
+
+def now_est():
+    """Current time in US/Eastern from whichever clock is driving the bot."""
+    return _CLOCK.now()
@@ -1,8 +1,21 @@
 import logging
 
+from bar_store import validate_bar_size
+from profiling import PROFILE_MODES
+
+
+STRATEGY_ENGINES = ("pandas", "numpy")
+INDICATOR_BACKENDS = ("auto", "pandas", "numba", "numpy")
+STOP_MODES = ("local", "native", "off")
+
 
 class StrategyConfig:
-    def __init__(self):
+    def __init__(self, **overrides):
+        # Identifies this parameter set when several strategies share one process
+        self.strategy_name = "default"
+        # IBKR account the strategy trades in. None routes to the default account.
+        self.account = None
+
         self.ib_host = "127.0.0.1"
         self.ib_port = 7497  # Port for workstation Paper Trading
         # self.ib_port = 4002  # Make sure this matches your Paper Trading port
@@ -17,6 +30,25 @@ class StrategyConfig:
         self.max_position_usd = 20000
         self.atr_stop_multiplier = 2.0
 
+        # Exit fast path for the ATR trailing stop:
+        # "local" caches each position's stop and checks it on every streamed tick,
+        # "native" attaches an IBKR trailing stop order to each entry,
+        # "off" only exits on the periodic full recompute.
+        self.stop_mode = "local"
+
+        # Asyncio main loop: seconds between monitor passes. Each pass re-requests
+        # bars for every holding, so keep this well clear of IBKR's 15s pacing rule.
+        self.monitor_interval_seconds = 30
+        # Historical-data requests the monitor and scan tasks may have in flight
+        # at once, together. Bursts past a handful trip IBKR's pacing violations.
+        self.max_concurrent_requests = 4
+
+        # Sharded scan: 0 scans in-process, N splits the universe across N worker
+        # processes. Worker i connects with clientId scan_worker_client_id_base + i
+        # and streams BUY signals back to this process, which places the orders.
+        self.scan_workers = 0
+        self.scan_worker_client_id_base = 100
+
         # Indicator Settings
         self.sma_slow = 50
         self.ema_fast = 20
@@ -24,11 +56,90 @@ class StrategyConfig:
         self.adx_window = 14
         self.adx_threshold = 25
 
+        # ATR/ADX implementation: "pandas" (reference), "numba", "numpy", or
+        # "auto" to use the fused numba kernel when it is installed.
+        self.indicator_backend = "auto"
+
+        # "pandas" runs the filter chain step by step on the DataFrame,
+        # "numpy" evaluates it in one pass over contiguous arrays.
+        self.strategy_engine = "pandas"
+
         # 1 year is just enough runway for the 50-SMA and EWMA indicators to stabilize
         # before reading today's current value.
         self.lookback_duration = "1 Y"
 
+        # Bar Settings
+        # Intraday sizes ("1 min", "5 mins", "15 mins", ...) are resampled from a
+        # local store of 1-minute bars instead of requested per size from IBKR.
+        self.bar_size = "1 day"
+        self.intraday_lookback_duration = "5 D"
+        self.intraday_retention_days = 10
+        self.intraday_refresh_seconds = 30
+        self.intraday_store_dir = None  # e.g. "bar_store" to persist minute bars
+        # Symbols whose bar history is held in memory (minute store, and the
+        # completed daily sessions behind daily_from_minute_store)
+        self.intraday_memory_symbols = 500
+        # Build today's daily bar from the minute store instead of a separate daily
+        # request. StrategyRunner turns this on when it also hosts intraday strategies.
+        self.daily_from_minute_store = False
+        # ‼️ NEW: Memory-mapped daily bar archive; only missing days are fetched
+        self.bar_archive_dir = None  # e.g. "bar_archive"
+
+        # Profiling: profile the first N cycles at startup (0 = off). A SIGUSR1
+        # at runtime profiles the next max(N, 1) cycles.
+        # "cprofile" writes .pstats, "sampling" writes collapsed stacks (.folded).
+        self.profile_chunks = 0
+        self.profile_mode = "cprofile"
+        self.profile_dir = "profiles"
+        self.profile_sample_interval = 0.005
+
+        # Data-quality gate, applied to every fetched series before indicators.
+        # Histories shorter than sma_slow are always rejected. Held symbols are
+        # never rejected, so bad data cannot block an exit.
+        self.quality_max_bad_bars = 2  # NaN/non-positive bars repaired by dropping them
+        # Open vs prior close at a split ratio (either way) flags an unadjusted
+        # split; only recent sessions are checked, IBKR adjusts older ones.
+        self.quality_split_ratios = (2.0, 3.0, 4.0, 5.0, 10.0)
+        self.quality_split_tolerance = 0.02
+        self.quality_split_window = 5
+        self.quality_min_range_pct = 0.001  # mean (high-low)/close over adx_window
+        self.quality_max_zero_volume_pct = 0.2  # over the last sma_slow bars
+        self.quality_max_failures = 3  # consecutive rejects before a cool-down
+        self.quality_cooldown_days = 5
+        self.quality_cooldown_file = "data_quality_cooldown.json"
+
+        self._apply_overrides(overrides)
         self._validate_risk_parameters()
+        self._validate_choices()
+
+    def _apply_overrides(self, overrides):
+        """
+        Lets a runner host several parameter sets by overriding the defaults
+        above, while rejecting typos that would otherwise be silently ignored.
+        """
+        for key, value in overrides.items():
+            if not hasattr(self, key):
+                raise ValueError(f"Unknown StrategyConfig setting: {key}")
+            setattr(self, key, value)
+
+    def _validate_choices(self):
+        """
+        Fails fast on enumerated settings so a typo can't silently fall back
+        to a different bar size or engine.
+        """
+        validate_bar_size(self.bar_size)
+
+        choices = {
+            "indicator_backend": INDICATOR_BACKENDS,
+            "strategy_engine": STRATEGY_ENGINES,
+            "stop_mode": STOP_MODES,
+            "profile_mode": PROFILE_MODES,
+        }
+        for name, allowed in choices.items():
+            if getattr(self, name) not in allowed:
+                raise ValueError(
+                    f"Unknown {name} '{getattr(self, name)}'. Choose one of {allowed}."
+                )
 
     def _validate_risk_parameters(self):
         """
@@ -41,3 +152,21 @@ class StrategyConfig:
                 f"greater than or equal to max_position_pct ({self.max_position_pct}). "
                 "This will artificially cap the ATR position sizing."
             )
+
+
+def build_strategy_configs():
+    """
+    Returns every strategy instance the runner should host in this process.
+    Each entry gets its own account, position book and risk budget while
+    sharing the bar cache and indicator engine.
+    """
+    return [
+        StrategyConfig(),
+        # StrategyConfig(
+        #     strategy_name="fast_trend",
+        #     account="DU7654321",
+        #     sma_slow=30,
+        #     ema_fast=10,
+        #     risk_per_trade_pct=0.005,
+        # ),
+    ]
@@ -1,9 +1,22 @@
+import collections
 import pandas as pd
 import json
 import urllib.request
 import os
+import atexit
+import logging
 from ib_insync import Stock, util
 
+from archive import BarArchive, duration_start
+from bar_store import MinuteBarStore, is_intraday_bar_size, resample_bars
+from clock import now_est
+
+
+_MINUTE_STORES = {}
+_BAR_ARCHIVE = None
+# (symbol, lookback_duration) -> (session date, completed daily bars), LRU order
+_DAILY_HISTORY = collections.OrderedDict()
+
 
 def format_symbols_for_ibkr(symbol_series):
     return symbol_series.str.replace(".", " ", regex=False).str.replace(
@@ -45,7 +58,7 @@ def get_all_us_symbols():
     """
     Fetches all available US stock symbols using the official SEC API.
     """
-    print("Fetching all US stock symbols from the SEC...")
+    logging.info("Fetching all US stock symbols from the SEC...")
 
     try:
         raw_data = _fetch_sec_raw_data()
@@ -65,12 +78,12 @@ def get_all_us_symbols():
         return format_symbols_for_ibkr(pd.Series(unique_symbols)).tolist()
 
     except Exception as e:
-        print(f"Failed to fetch SEC symbols: {e}. Falling back to S&P 500.")
+        logging.error(f"Failed to fetch SEC symbols: {e}. Falling back to S&P 500.")
         return get_sp500_symbols()
 
 
 def get_sp500_symbols():
-    print("Fetching latest S&P 500 symbols from Wikipedia...")
+    logging.info("Fetching latest S&P 500 symbols from Wikipedia...")
     url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
 
     # we need to ensure Wikipedia doesn't crash the script too.
@@ -84,7 +97,7 @@ def get_sp500_symbols():
         symbols = format_symbols_for_ibkr(filtered_symbols).tolist()
         return symbols
     except Exception as e:
-        print(f"‼️ Failed to fetch S&P 500 symbols from Wikipedia: {e}.")
+        logging.error(f"‼️ Failed to fetch S&P 500 symbols from Wikipedia: {e}.")
         return []
 
 
@@ -95,17 +108,300 @@ def build_end_date(target_date_str=None):
         return f"{target_date_str} 23:59:59"
 
 
-def fetch_historical_data(ib, config, symbol="SPY", end_date_str=None):
+def get_minute_store(config):
+    """
+    Process-wide 1-minute bar store, shared by every strategy with the same
+    store settings so each symbol is downloaded once regardless of the bar
+    sizes in use.
+    """
+    key = (
+        config.intraday_retention_days,
+        config.intraday_refresh_seconds,
+        config.intraday_store_dir,
+        config.intraday_memory_symbols,
+    )
+    if key not in _MINUTE_STORES:
+        _MINUTE_STORES[key] = MinuteBarStore(
+            retention_days=config.intraday_retention_days,
+            refresh_seconds=config.intraday_refresh_seconds,
+            cache_dir=config.intraday_store_dir,
+            max_symbols=config.intraday_memory_symbols,
+        )
+    return _MINUTE_STORES[key]
+
+
+def _intraday_request(config, end_date_str):
+    return {
+        "endDateTime": build_end_date(end_date_str),
+        "durationStr": config.intraday_lookback_duration,
+        "barSizeSetting": "1 min",
+        "whatToShow": "TRADES",
+        "useRTH": True,
+        "formatDate": 2,
+    }
+
+
+def _daily_request(end_date_str, duration):
+    return {
+        "endDateTime": build_end_date(end_date_str),
+        "durationStr": duration,
+        "barSizeSetting": "1 day",
+        "whatToShow": "TRADES",
+        "useRTH": True,
+        "formatDate": 1,
+    }
+
+
+def fetch_intraday_data(ib, config, symbol="SPY", end_date_str=None):
+    """
+    Intraday bars built from 1-minute data. Live requests go through the
+    incremental minute store; "as of" requests bypass it.
+    """
+    contract = Stock(symbol, "SMART", "USD")
+
+    if end_date_str is None:
+        minute_df = get_minute_store(config).update(
+            ib, contract, config.intraday_lookback_duration
+        )
+    else:
+        bars = ib.reqHistoricalData(contract, **_intraday_request(config, end_date_str))
+        minute_df = util.df(bars)
+
+    return resample_bars(minute_df, config.bar_size)
+
+
+def get_bar_archive(config):
+    """
+    Process-wide daily bar archive, or None when config.bar_archive_dir is unset.
+    """
+    global _BAR_ARCHIVE
+    if _BAR_ARCHIVE is None and config.bar_archive_dir:
+        _BAR_ARCHIVE = BarArchive(config.bar_archive_dir)
+        atexit.register(_BAR_ARCHIVE.flush)
+    return _BAR_ARCHIVE
+
+
+def flush_bar_archive():
+    """Writes every bar staged since the last flush in one append per column."""
+    if _BAR_ARCHIVE is not None:
+        _BAR_ARCHIVE.flush()
+
+
+def _archive_request_duration(config, archive, symbol, today):
+    """
+    Returns (durationStr, full). The full lookback is requested, to replace
+    the symbol's history, when the archive is stale or starts after the
+    lookback window (e.g. lookback_duration was lengthened); otherwise only
+    the days since the last archived bar. durationStr is None when the
+    archive is already current.
+    """
+    start = duration_start(today, config.lookback_duration)
+    last_day = archive.last_day(symbol)
+    covered_from = archive.covered_from(symbol)
+    if last_day is None or last_day < start or covered_from is None or covered_from > start:
+        return config.lookback_duration, True
+
+    gap_days = (today - last_day).days
+    if gap_days <= 0:
+        return None, False
+    return f"{gap_days + 1} D", False
+
+
+def _is_restated(archive, symbol, fresh):
+    """
+    The incremental request re-covers the last archived day; if IBKR now
+    reports it differently (a split was back-adjusted), the whole archived
+    history for the symbol is stale.
+    """
+    if not archive.differs(symbol, fresh):
+        return False
+    logging.warning(
+        f"Archived bars for {symbol} were restated by IBKR. Refetching the full lookback..."
+    )
+    return True
+
+
+def _merge_into_archive(config, archive, symbol, fresh, today, replace=False):
+    """
+    Stages completed sessions from `fresh` (or, with replace, swaps them in
+    for the symbol's whole history) and returns the lookback window read
+    back from the archive, with today's partial bar appended.
+    """
+    start = duration_start(today, config.lookback_duration)
+    live = None
+    if fresh is not None and not fresh.empty:
+        is_completed = pd.to_datetime(fresh["date"]).dt.date < today
+        if replace:
+            archive.replace(symbol, fresh[is_completed], covered_from=start)
+        else:
+            archive.stage(symbol, fresh[is_completed])
+        live = fresh.loc[~is_completed, ["date", "open", "high", "low", "close", "volume"]]
+        live = live.assign(date=pd.to_datetime(live["date"]))
+
+    if symbol not in archive:
+        return fresh
+
+    df = archive.read_frame(symbol, start=start)
+    if live is not None and not live.empty:
+        df = pd.concat([df, live], ignore_index=True)
+    return df
+
+
+def fetch_archived_daily_data(ib, config, archive, symbol="SPY"):
+    """
+    Daily bars served from the archive. Only the days since the last
+    archived bar are requested from IBKR; completed sessions are staged for
+    the next flush and today's partial bar is appended on the fly. A
+    restated overlap bar triggers a full refetch that rewrites the symbol.
+    """
+    today = now_est().date()
+    duration, full = _archive_request_duration(config, archive, symbol, today)
     contract = Stock(symbol, "SMART", "USD")
-    target_end = build_end_date(end_date_str)
 
+    fresh = None
+    if duration is not None:
+        fresh = util.df(ib.reqHistoricalData(contract, **_daily_request(None, duration)))
+        if not full and _is_restated(archive, symbol, fresh):
+            full = True
+            fresh = util.df(
+                ib.reqHistoricalData(contract, **_daily_request(None, config.lookback_duration))
+            )
+
+    return _merge_into_archive(config, archive, symbol, fresh, today, replace=full)
+
+
+def _fetch_daily_bars(ib, config, symbol, end_date_str=None):
+    archive = get_bar_archive(config)
+    if archive is not None and end_date_str is None:
+        return fetch_archived_daily_data(ib, config, archive, symbol)
+
+    contract = Stock(symbol, "SMART", "USD")
     bars = ib.reqHistoricalData(
-        contract,
-        endDateTime=target_end,
-        durationStr=config.lookback_duration,
-        barSizeSetting="1 day",
-        whatToShow="TRADES",
-        useRTH=True,
-        formatDate=1,
+        contract, **_daily_request(end_date_str, config.lookback_duration)
+    )
+    return util.df(bars)
+
+
+def _cached_daily_history(config, symbol, today):
+    key = (symbol, config.lookback_duration)
+    entry = _DAILY_HISTORY.get(key)
+    if entry is None or entry[0] != today:
+        return None
+    _DAILY_HISTORY.move_to_end(key)
+    return entry[1]
+
+
+def _store_daily_history(config, symbol, today, df):
+    """
+    Keeps only completed sessions; today's bar comes from the minute store.
+    Holds at most config.intraday_memory_symbols entries, like the store.
+    """
+    if df is not None and not df.empty:
+        df = df[pd.to_datetime(df["date"]).dt.date < today].reset_index(drop=True)
+    key = (symbol, config.lookback_duration)
+    _DAILY_HISTORY[key] = (today, df)
+    _DAILY_HISTORY.move_to_end(key)
+    while len(_DAILY_HISTORY) > config.intraday_memory_symbols:
+        _DAILY_HISTORY.popitem(last=False)
+    return df
+
+
+def _with_todays_bar(history, minute_df, today):
+    today_bar = resample_bars(minute_df, "1 day")
+    if today_bar is not None and not today_bar.empty:
+        today_bar = today_bar[today_bar["date"] == today]
+
+    frames = [df for df in (history, today_bar) if df is not None and not df.empty]
+    if not frames:
+        return history
+    return pd.concat(frames, ignore_index=True)
+
+
+def fetch_daily_from_minutes(ib, config, symbol="SPY"):
+    """
+    Daily bars for a runner that also hosts intraday strategies. Completed
+    sessions are fetched once per day, and today's bar is resampled from the
+    shared minute store, so the daily and intraday views of a symbol cost a
+    single broker request per refresh.
+    """
+    today = now_est().date()
+    history = _cached_daily_history(config, symbol, today)
+    if history is None:
+        history = _store_daily_history(
+            config, symbol, today, _fetch_daily_bars(ib, config, symbol)
+        )
+
+    contract = Stock(symbol, "SMART", "USD")
+    minute_df = get_minute_store(config).update(
+        ib, contract, config.intraday_lookback_duration
+    )
+    return _with_todays_bar(history, minute_df, today)
+
+
+def fetch_historical_data(ib, config, symbol="SPY", end_date_str=None):
+    if is_intraday_bar_size(config.bar_size):
+        return fetch_intraday_data(ib, config, symbol, end_date_str)
+
+    if config.daily_from_minute_store and end_date_str is None:
+        return fetch_daily_from_minutes(ib, config, symbol)
+
+    return _fetch_daily_bars(ib, config, symbol, end_date_str)
+
+
+async def fetch_historical_data_async(ib, config, symbol="SPY", end_date_str=None):
+    """
+    Awaitable twin of fetch_historical_data for the asyncio main loop, so a
+    slow download never blocks the other tasks.
+    """
+    contract = Stock(symbol, "SMART", "USD")
+
+    if is_intraday_bar_size(config.bar_size):
+        if end_date_str is None:
+            minute_df = await get_minute_store(config).update_async(
+                ib, contract, config.intraday_lookback_duration
+            )
+        else:
+            bars = await ib.reqHistoricalDataAsync(
+                contract, **_intraday_request(config, end_date_str)
+            )
+            minute_df = util.df(bars)
+        return resample_bars(minute_df, config.bar_size)
+
+    if config.daily_from_minute_store and end_date_str is None:
+        today = now_est().date()
+        history = _cached_daily_history(config, symbol, today)
+        if history is None:
+            history = _store_daily_history(
+                config, symbol, today, await _fetch_daily_bars_async(ib, config, symbol)
+            )
+        minute_df = await get_minute_store(config).update_async(
+            ib, contract, config.intraday_lookback_duration
+        )
+        return _with_todays_bar(history, minute_df, today)
+
+    return await _fetch_daily_bars_async(ib, config, symbol, end_date_str)
+
+
+async def _fetch_daily_bars_async(ib, config, symbol, end_date_str=None):
+    contract = Stock(symbol, "SMART", "USD")
+
+    archive = get_bar_archive(config)
+    if archive is not None and end_date_str is None:
+        today = now_est().date()
+        duration, full = _archive_request_duration(config, archive, symbol, today)
+        fresh = None
+        if duration is not None:
+            bars = await ib.reqHistoricalDataAsync(contract, **_daily_request(None, duration))
+            fresh = util.df(bars)
+            if not full and _is_restated(archive, symbol, fresh):
+                full = True
+                bars = await ib.reqHistoricalDataAsync(
+                    contract, **_daily_request(None, config.lookback_duration)
+                )
+                fresh = util.df(bars)
+        return _merge_into_archive(config, archive, symbol, fresh, today, replace=full)
+
+    bars = await ib.reqHistoricalDataAsync(
+        contract, **_daily_request(end_date_str, config.lookback_duration)
     )
     return util.df(bars)
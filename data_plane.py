@@ -0,0 +1,160 @@
+import asyncio
+import logging
+
+from data import fetch_historical_data, fetch_historical_data_async, flush_bar_archive
+from indicators import calculate_indicators, calculate_indicators_batch
+from quality import get_quality_gate
+
+
+def _indicator_key(config):
+    """
+    The subset of StrategyConfig that changes the indicator output.
+    Strategies sharing these settings share one indicator pass per symbol.
+    """
+    return (
+        config.bar_size,
+        config.lookback_duration,
+        config.sma_slow,
+        config.ema_fast,
+        config.volume_window,
+        config.adx_window,
+    )
+
+
+class SharedDataPlane:
+    """
+    Bar cache and indicator engine shared by every strategy hosted in the
+    process. Each symbol is fetched once per trading cycle and its indicators
+    are computed once per distinct indicator parameter set, then fanned out.
+    Asynchronous downloads share one limit on requests in flight, whichever
+    task issues them.
+    """
+
+    def __init__(self, max_concurrent_requests=4):
+        self._bars = {}
+        self._indicators = {}
+        self.max_concurrent_requests = max_concurrent_requests
+        self._request_slots = None
+        self.fetches = 0
+        self.hits = 0
+
+    def begin_cycle(self):
+        """
+        Drops everything cached during the previous cycle so the live bar
+        is refreshed at least once per monitor/scan pass. Bars archived during
+        the previous cycle are flushed to disk in one batch.
+        """
+        flush_bar_archive()
+        self._bars.clear()
+        self._indicators.clear()
+
+    def invalidate(self, symbols):
+        """Drops the cached bars and indicators of just these symbols."""
+        symbols = set(symbols)
+        for cache in (self._bars, self._indicators):
+            for key in [key for key in cache if key[0] in symbols]:
+                del cache[key]
+
+    @staticmethod
+    def _bar_key(config, symbol, end_date_str):
+        return (symbol, config.bar_size, config.lookback_duration, end_date_str)
+
+    def get_bars(self, ib, config, symbol, end_date_str=None):
+        key = self._bar_key(config, symbol, end_date_str)
+
+        if key not in self._bars:
+            self._bars[key] = fetch_historical_data(
+                ib, config, symbol=symbol, end_date_str=end_date_str
+            )
+            self.fetches += 1
+        else:
+            self.hits += 1
+
+        return self._bars[key]
+
+    async def _fetch_limited(self, ib, config, symbol, end_date_str):
+        # Created on first use so it binds to the loop the tasks run on
+        if self._request_slots is None:
+            self._request_slots = asyncio.Semaphore(self.max_concurrent_requests)
+        async with self._request_slots:
+            return await fetch_historical_data_async(ib, config, symbol, end_date_str)
+
+    async def prefetch_async(self, ib, configs, symbols, end_date_str=None):
+        """
+        Downloads every uncached (symbol, bar settings) pair concurrently,
+        at most max_concurrent_requests at a time across all callers, without
+        blocking the event loop. The get_bars/get_indicators calls that
+        follow are then served from the cache. Failed downloads stay uncached
+        so the synchronous path retries them.
+        """
+        pending = {}
+        for config in configs:
+            for symbol in symbols:
+                key = self._bar_key(config, symbol, end_date_str)
+                if key not in self._bars and key not in pending:
+                    pending[key] = self._fetch_limited(ib, config, symbol, end_date_str)
+
+        results = await asyncio.gather(*pending.values(), return_exceptions=True)
+        for key, result in zip(pending, results):
+            if isinstance(result, Exception):
+                logging.error(f"‼️ Prefetch failed for {key[0]}: {result}")
+                continue
+            self._bars[key] = result
+            self.fetches += 1
+
+    def warm_indicators(self, configs, symbols, end_date_str=None):
+        """
+        Validates and computes indicators for a whole scan chunk in one
+        vectorized batch per distinct indicator parameter set, for every
+        symbol whose bars are already cached. get_indicators then serves the
+        chunk from the cache.
+        """
+        seen = set()
+        for config in configs:
+            params = _indicator_key(config)
+            if params in seen:
+                continue
+            seen.add(params)
+
+            frames = {}
+            for symbol in symbols:
+                bar_key = self._bar_key(config, symbol, end_date_str)
+                if (symbol, end_date_str) + params in self._indicators:
+                    continue
+                if bar_key in self._bars:
+                    frames[symbol] = self._bars[bar_key]
+            if not frames:
+                continue
+
+            clean = get_quality_gate(config).check_batch(frames, config)
+            results = calculate_indicators_batch(
+                {symbol: df.copy() for symbol, df in clean.items()}, config
+            )
+            for symbol in frames:
+                self._indicators[(symbol, end_date_str) + params] = results.get(symbol)
+
+    def get_indicators(self, ib, config, symbol, end_date_str=None, held=False):
+        """
+        Returns a private copy of the indicator frame so the strategy filter
+        chain can mutate its own Trend columns without leaking into the
+        other strategies reading the same symbol. For a held symbol, a frame
+        the scan's quality check rejected is recomputed without the reject.
+        """
+        key = (symbol, end_date_str) + _indicator_key(config)
+
+        if key not in self._indicators or (held and self._indicators[key] is None):
+            df = self.get_bars(ib, config, symbol, end_date_str)
+            df = get_quality_gate(config).check(symbol, df, config, held=held)
+            if df is not None and not df.empty:
+                df = calculate_indicators(df.copy(), config)
+            self._indicators[key] = df
+
+        df = self._indicators[key]
+        if df is None:
+            return None
+        return df.copy()
+
+    def log_stats(self):
+        logging.info(
+            f"Data plane: {self.fetches} broker fetches, {self.hits} shared cache hits."
+        )
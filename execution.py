@@ -1,8 +1,17 @@
-from ib_insync import LimitOrder, MarketOrder, Stock
+from ib_insync import LimitOrder, MarketOrder, Order, Stock
 from ib_insync import IB
 import logging
 
-from account import verify_paper_account, verify_cash_account
+from account import verify_paper_account, verify_cash_account, get_account_state
+
+
+# Tags the broker-side trailing stops attached to entries so the pending-share
+# math and the end-of-day sweep can tell them apart from strategy orders.
+PROTECTIVE_STOP_REF = "protective_stop"
+
+
+def _is_protective_stop(trade):
+    return trade.order.orderRef == PROTECTIVE_STOP_REF
 
 
 def on_fill_event(trade, fill):
@@ -11,17 +20,30 @@ def on_fill_event(trade, fill):
     """
     status = "PARTIAL FILL" if trade.orderStatus.remaining > 0 else "FULL FILL"
     logging.info(
-        f"{status}: {fill.execution.side} {fill.execution.shares} shares of {trade.contract.symbol} @ {fill.execution.price}"
+        f"{status}: {fill.execution.side} {fill.execution.shares} shares of {trade.contract.symbol} @ {fill.execution.price}",
+        extra={
+            "event": "fill",
+            "symbol": trade.contract.symbol,
+            "side": fill.execution.side,
+            "shares": fill.execution.shares,
+            "price": fill.execution.price,
+            "remaining": trade.orderStatus.remaining,
+        },
     )
     logging.info(f"Remaining to fill: {trade.orderStatus.remaining} shares")
 
 
-def get_pending_shares(ib, symbol, action):
+def get_pending_shares(ib, symbol, action, account=None):
     """
     Calculates how many shares are currently tied up in open orders.
     """
     pending_shares = 0.0
     for trade in ib.openTrades():
+        if account and trade.order.account != account:
+            continue
+        # Resting protective stops aren't a pending exit, they only fire on a drop
+        if _is_protective_stop(trade):
+            continue
         if trade.contract.symbol == symbol and trade.order.action == action:
             remaining = trade.order.totalQuantity - trade.orderStatus.filled
             if remaining > 0:
@@ -29,18 +51,15 @@ def get_pending_shares(ib, symbol, action):
     return pending_shares
 
 
-def get_available_funds(ib):
+def get_available_funds(ib, account=None):
     """Returns the available cash in the account for trading."""
-    account_values = ib.accountValues()
-    for val in account_values:
-        if val.tag == "AvailableFunds" and val.currency == "USD":
-            return float(val.value)
-    return 0.0
+    available_funds = get_account_state(ib, account).available_funds
+    return available_funds if available_funds is not None else 0.0
 
 
-def get_current_positions(ib):
+def get_current_positions(ib, account=None):
     """Returns a dictionary of {symbol: quantity} for current open positions."""
-    positions = ib.positions()
+    positions = ib.positions(account or "")
     current_holdings = {}
     for p in positions:
         if p.position != 0:
@@ -74,49 +93,157 @@ def _format_limit_price(price):
     return limit_price
 
 
-def _place_and_monitor_order(ib, contract, order):
+def _place_and_monitor_order(ib, contract, order, account=None):
     """
     Trade placement and event binding
     so all orders consistently use the same tracking logic.
     """
+    if account:
+        order.account = account
     trade = ib.placeOrder(contract, order)
     trade.fillEvent += on_fill_event
     return trade
 
 
-def execute_limit_order(ib, symbol, action, quantity, price):
-    """Executes a live limit order."""
+def _build_trailing_stop(ib, parent, trailing_amount, stop_price):
+    """
+    Turns a BUY limit order into the parent of a broker-native trailing stop.
+    The parent is held back (transmit=False) until the child is placed, so
+    IBKR only ever sees the entry together with its protection.
+    """
+    parent.orderId = ib.client.getReqId()
+    parent.transmit = False
+
+    stop = Order(
+        action="SELL",
+        orderType="TRAIL",
+        totalQuantity=parent.totalQuantity,
+        auxPrice=_format_limit_price(trailing_amount),
+        parentId=parent.orderId,
+        tif="GTC",
+        orderRef=PROTECTIVE_STOP_REF,
+        transmit=True,
+    )
+    if stop_price is not None and stop_price == stop_price and stop_price > 0:
+        stop.trailStopPrice = _format_limit_price(stop_price)
+    return stop
+
+
+def execute_limit_order(
+    ib,
+    symbol,
+    action,
+    quantity,
+    price,
+    account=None,
+    trailing_amount=None,
+    trailing_stop_price=None,
+):
+    """
+    Executes a live limit order. When a trailing_amount is given the entry
+    is sent with a native IBKR trailing stop attached as a child order.
+    """
     limit_price = _format_limit_price(price)
-    print(
-        f"TRANSMITTING ORDER: {action} {quantity} shares of {symbol} at Limit ${limit_price}"
+    logging.info(
+        f"TRANSMITTING ORDER: {action} {quantity} shares of {symbol} at Limit ${limit_price}",
+        extra={
+            "event": "order",
+            "symbol": symbol,
+            "action": action,
+            "quantity": float(quantity),
+            "order_type": "LMT",
+            "limit_price": limit_price,
+        },
     )
 
     contract = _create_qualified_contract(ib, symbol)
     order = LimitOrder(action, quantity, limit_price)
 
-    return _place_and_monitor_order(ib, contract, order)
+    if not trailing_amount:
+        return _place_and_monitor_order(ib, contract, order, account)
+
+    stop = _build_trailing_stop(ib, order, trailing_amount, trailing_stop_price)
+    trade = _place_and_monitor_order(ib, contract, order, account)
+    _place_and_monitor_order(ib, contract, stop, account)
+    logging.info(
+        f"Attached trailing stop to {symbol}: trail ${stop.auxPrice}"
+        + (f", initial stop ${stop.trailStopPrice}" if stop.trailStopPrice else "")
+    )
+    return trade
 
 
-def execute_market_order(ib, symbol, action, quantity):
+def execute_market_order(ib, symbol, action, quantity, account=None):
     """Executes a live market order."""
-    print(f"TRANSMITTING ORDER: {action} {quantity} shares of {symbol} at Market Price")
+    logging.info(
+        f"TRANSMITTING ORDER: {action} {quantity} shares of {symbol} at Market Price",
+        extra={
+            "event": "order",
+            "symbol": symbol,
+            "action": action,
+            "quantity": float(quantity),
+            "order_type": "MKT",
+        },
+    )
 
     contract = _create_qualified_contract(ib, symbol)
     order = MarketOrder(action, quantity)
 
-    return _place_and_monitor_order(ib, contract, order)
+    return _place_and_monitor_order(ib, contract, order, account)
 
 
-def get_net_liquidation_value(ib):
+def execute_stop_exit(ib, contract, quantity, stop_price, price, account=None):
+    """
+    Market exit fired from a price-stream callback. Takes an already
+    qualified contract because blocking broker calls are not allowed
+    inside ib_insync event handlers.
+    """
+    logging.warning(
+        f"🛑 STOP HIT: {contract.symbol} @ {price} < stop {stop_price:.4f}. "
+        f"Selling {quantity} shares at Market Price",
+        extra={
+            "event": "stop_exit",
+            "symbol": contract.symbol,
+            "quantity": float(quantity),
+            "price": price,
+            "stop": stop_price,
+        },
+    )
+    order = MarketOrder("SELL", quantity)
+    return _place_and_monitor_order(ib, contract, order, account)
+
+
+def subscribe_price_stream(ib, symbol):
+    """
+    Opens a streaming market-data line for a held symbol.
+    Returns the qualified contract and its live Ticker.
+    """
+    contract = _create_qualified_contract(ib, symbol)
+    ticker = ib.reqMktData(contract, "", False, False)
+    return contract, ticker
+
+
+def cancel_protective_stops(ib, symbol, account=None):
+    """
+    Pulls any resting native trailing stop before a signal-driven exit so
+    both can't sell the same shares.
+    """
+    for trade in ib.openTrades():
+        if not _is_protective_stop(trade) or trade.contract.symbol != symbol:
+            continue
+        if account and trade.order.account != account:
+            continue
+        logging.info(f"Canceling protective stop for {symbol}")
+        ib.cancelOrder(trade.order)
+
+
+def get_net_liquidation_value(ib, account=None):
     """
     Extracted function to get the total account equity (cash + active stock value).
     This keeps your strategy's base math stable even when your cash is tied up in trades.
     """
-    account_values = ib.accountValues()
-    for val in account_values:
-        if val.tag == "NetLiquidation" and val.currency == "USD":
-            return float(val.value)
-    return None
+    state = get_account_state(ib, account)
+    state.refresh_if_stale(ib)
+    return state.net_liquidation
 
 
 def cancel_all_open_orders(ib):
@@ -131,6 +258,10 @@ def cancel_all_open_orders(ib):
     logging.info(f"END OF DAY: Canceling {len(open_trades)} open orders...")
 
     for trade in open_trades:
+        # Protective stops are GTC and must keep guarding positions overnight
+        if _is_protective_stop(trade):
+            continue
+
         # Only attempt to cancel orders that are actually pending
         if trade.orderStatus.status in ["PreSubmitted", "Submitted", "PendingSubmit"]:
             logging.info(
@@ -1,6 +1,9 @@
+import logging
 import numpy as np
 import pandas as pd
 
+from kernels import NUMBA_AVAILABLE, compute_atr_adx
+
 
 def _calculate_true_range(df):
     high_low = df["high"] - df["low"]
@@ -65,6 +68,56 @@ def add_adx_indicator(df, window):
     return df
 
 
+def _kernel_backend(config):
+    """
+    Resolves config.indicator_backend to a kernels.py backend name, or None
+    for the reference pandas implementation.
+    """
+    backend = config.indicator_backend
+    if backend == "auto":
+        # The NumPy fallback only pays off when vectorized across many symbols
+        return "numba" if NUMBA_AVAILABLE else None
+    if backend == "pandas":
+        return None
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        _warn_numba_missing()
+        return "numpy"
+    return backend
+
+
+_NUMBA_WARNING_LOGGED = False
+
+
+def _warn_numba_missing():
+    global _NUMBA_WARNING_LOGGED
+    if not _NUMBA_WARNING_LOGGED:
+        logging.warning(
+            "⚠️ indicator_backend='numba' but numba is not installed. "
+            "Falling back to the NumPy kernel."
+        )
+        _NUMBA_WARNING_LOGGED = True
+
+
+def add_atr_adx_indicators(df, window, backend):
+    """
+    Fused replacement for add_adx_indicator + add_atr_indicator. True range
+    is computed once and ATR doubles as the ADX TR smoothing.
+    """
+    if df is None or df.empty:
+        return df
+
+    atr, adx = compute_atr_adx(
+        df["high"].to_numpy(),
+        df["low"].to_numpy(),
+        df["close"].to_numpy(),
+        window,
+        backend,
+    )
+    df["ADX"] = adx
+    df["ATR"] = atr
+    return df
+
+
 def calculate_indicators(df, config):
     if df is None or df.empty:
         return df
@@ -73,7 +126,77 @@ def calculate_indicators(df, config):
     df["EMA_Fast"] = df["close"].ewm(span=config.ema_fast, adjust=False).mean()
 
     df = add_volume_indicators(df, config.volume_window)
-    df = add_adx_indicator(df, config.adx_window)
-    df = add_atr_indicator(df, config.adx_window)
+
+    backend = _kernel_backend(config)
+    if backend is None:
+        df = add_adx_indicator(df, config.adx_window)
+        df = add_atr_indicator(df, config.adx_window)
+    else:
+        df = add_atr_adx_indicators(df, config.adx_window, backend)
 
     return df
+
+
+def _stack_panel(frames, column):
+    """
+    Left-aligns one column of every frame into a (bars x symbols) array,
+    NaN-padded after each symbol's last bar.
+    """
+    n_bars = max(len(df) for df in frames)
+    panel = np.full((n_bars, len(frames)), np.nan)
+    for j, df in enumerate(frames):
+        panel[: len(df), j] = df[column].to_numpy(dtype=np.float64)
+    return panel
+
+
+def calculate_indicators_batch(frames_by_symbol, config):
+    """
+    Batch form of calculate_indicators for a chunk of symbols. Rolling and
+    EWM indicators run column-wise over one panel and ATR/ADX go through
+    the fused kernel vectorized across symbols, instead of one pandas pass
+    per symbol. Output frames match calculate_indicators. The "pandas"
+    backend keeps the reference per-symbol path.
+    """
+    symbols = [
+        sym for sym, df in frames_by_symbol.items() if df is not None and not df.empty
+    ]
+    results = dict(frames_by_symbol)
+    if not symbols:
+        return results
+
+    if config.indicator_backend == "pandas":
+        for sym in symbols:
+            results[sym] = calculate_indicators(frames_by_symbol[sym], config)
+        return results
+
+    frames = [frames_by_symbol[sym] for sym in symbols]
+    close = pd.DataFrame(_stack_panel(frames, "close"))
+
+    sma_slow = close.rolling(window=config.sma_slow).mean().to_numpy()
+    ema_fast = close.ewm(span=config.ema_fast, adjust=False).mean().to_numpy()
+
+    volume_sma = None
+    if all("volume" in df.columns for df in frames):
+        volume = pd.DataFrame(_stack_panel(frames, "volume"))
+        volume_sma = volume.rolling(window=config.volume_window).mean().to_numpy()
+
+    atr, adx = compute_atr_adx(
+        _stack_panel(frames, "high"),
+        _stack_panel(frames, "low"),
+        close.to_numpy(),
+        config.adx_window,
+        # Under "auto", the NumPy kernel beats pandas once vectorized across symbols
+        _kernel_backend(config) or "auto",
+    )
+
+    for j, (sym, df) in enumerate(zip(symbols, frames)):
+        n = len(df)
+        df["SMA_Slow"] = sma_slow[:n, j]
+        df["EMA_Fast"] = ema_fast[:n, j]
+        if volume_sma is not None:
+            df["Volume_SMA"] = volume_sma[:n, j]
+        df["ADX"] = adx[:n, j]
+        df["ATR"] = atr[:n, j]
+        results[sym] = df
+
+    return results
@@ -0,0 +1,189 @@
+import logging
+import numpy as np
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the local install
+    NUMBA_AVAILABLE = False
+
+
+# Both backends reproduce pandas' ewm(alpha, adjust=False) recursion exactly,
+# including how it carries the average across NaN inputs, so ATR/ADX match
+# the reference implementation in indicators.py bar for bar.
+
+
+def _fmax(a, b):
+    if a != a:
+        return b
+    if b != b:
+        return a
+    return a if a > b else b
+
+
+def _ewm_step(weighted, old_wt, cur, alpha):
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if cur == cur:
+            if weighted != cur:
+                weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+            old_wt = 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_wt
+
+
+def _wilder_atr_adx_loop(high, low, close, alpha, atr_out, adx_out):
+    """
+    Fused TR -> +DM/-DM -> Wilder smoothing -> DI/DX -> ADX, one pass over
+    the bars of each symbol column.
+    """
+    n_bars, n_symbols = high.shape
+
+    for j in range(n_symbols):
+        tr_w, tr_old = np.nan, 1.0
+        plus_w, plus_old = np.nan, 1.0
+        minus_w, minus_old = np.nan, 1.0
+        adx_w, adx_old = np.nan, 1.0
+
+        for t in range(n_bars):
+            h = high[t, j]
+            l = low[t, j]
+            tr = h - l
+            plus_dm = 0.0
+            minus_dm = 0.0
+
+            if t > 0:
+                prev_close = close[t - 1, j]
+                tr = _fmax(_fmax(tr, abs(h - prev_close)), abs(l - prev_close))
+
+                up_move = h - high[t - 1, j]
+                down_move = low[t - 1, j] - l
+                if up_move > down_move and up_move > 0:
+                    plus_dm = up_move
+                if down_move > up_move and down_move > 0:
+                    minus_dm = down_move
+
+            tr_w, tr_old = _ewm_step(tr_w, tr_old, tr, alpha)
+            plus_w, plus_old = _ewm_step(plus_w, plus_old, plus_dm, alpha)
+            minus_w, minus_old = _ewm_step(minus_w, minus_old, minus_dm, alpha)
+
+            plus_di = 100 * (plus_w / tr_w)
+            minus_di = 100 * (minus_w / tr_w)
+            dx = 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
+
+            adx_w, adx_old = _ewm_step(adx_w, adx_old, dx, alpha)
+
+            atr_out[t, j] = tr_w
+            adx_out[t, j] = adx_w
+
+
+if NUMBA_AVAILABLE:
+    # error_model="numpy" gives inf/NaN on zero division like pandas instead of raising
+    _fmax = njit(cache=True, error_model="numpy")(_fmax)
+    _ewm_step = njit(cache=True, error_model="numpy")(_ewm_step)
+    _wilder_atr_adx_loop = njit(cache=True, error_model="numpy")(_wilder_atr_adx_loop)
+
+
+def _ewm_step_vectorized(weighted, old_wt, cur, alpha):
+    has_value = ~np.isnan(weighted)
+    is_observation = ~np.isnan(cur)
+
+    old_wt = np.where(has_value, old_wt * (1.0 - alpha), old_wt)
+    updated = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+
+    weighted = np.where(has_value & is_observation & (weighted != cur), updated, weighted)
+    weighted = np.where(~has_value & is_observation, cur, weighted)
+    old_wt = np.where(has_value & is_observation, 1.0, old_wt)
+    return weighted, old_wt
+
+
+def _wilder_atr_adx_numpy(high, low, close, alpha, atr_out, adx_out):
+    """
+    NumPy fallback for machines without numba. Still a single loop over the
+    bars, but each step is vectorized across every symbol in the panel.
+    """
+    n_bars, n_symbols = high.shape
+    state = {
+        name: (np.full(n_symbols, np.nan), np.ones(n_symbols))
+        for name in ("tr", "plus", "minus", "adx")
+    }
+    zeros = np.zeros(n_symbols)
+
+    for t in range(n_bars):
+        h = high[t]
+        l = low[t]
+        tr = h - l
+        plus_dm = zeros
+        minus_dm = zeros
+
+        if t > 0:
+            prev_close = close[t - 1]
+            tr = np.fmax(np.fmax(tr, np.abs(h - prev_close)), np.abs(l - prev_close))
+
+            up_move = h - high[t - 1]
+            down_move = low[t - 1] - l
+            plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+            minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+        state["tr"] = _ewm_step_vectorized(*state["tr"], tr, alpha)
+        state["plus"] = _ewm_step_vectorized(*state["plus"], plus_dm, alpha)
+        state["minus"] = _ewm_step_vectorized(*state["minus"], minus_dm, alpha)
+
+        tr_w = state["tr"][0]
+        plus_di = 100 * (state["plus"][0] / tr_w)
+        minus_di = 100 * (state["minus"][0] / tr_w)
+        dx = 100 * (np.abs(plus_di - minus_di) / (plus_di + minus_di))
+
+        state["adx"] = _ewm_step_vectorized(*state["adx"], dx, alpha)
+
+        atr_out[t] = tr_w
+        adx_out[t] = state["adx"][0]
+
+
+def compute_atr_adx(high, low, close, window, backend="auto"):
+    """
+    Returns (ATR, ADX) for 1-D single-symbol arrays or 2-D (bars x symbols)
+    panels. Panels may be NaN-padded after each symbol's last bar.
+
+    backend: "numba", "numpy" or "auto" (numba when installed).
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    is_1d = high.ndim == 1
+    if is_1d:
+        high, low, close = high[:, None], low[:, None], close[:, None]
+
+    atr = np.empty_like(high)
+    adx = np.empty_like(high)
+    alpha = 1 / window
+
+    if backend == "auto":
+        backend = "numba" if NUMBA_AVAILABLE else "numpy"
+
+    if backend == "numba":
+        if not NUMBA_AVAILABLE:
+            raise ImportError("numba is not installed; use backend='numpy'.")
+        _wilder_atr_adx_loop(
+            np.ascontiguousarray(high),
+            np.ascontiguousarray(low),
+            np.ascontiguousarray(close),
+            alpha,
+            atr,
+            adx,
+        )
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            _wilder_atr_adx_numpy(high, low, close, alpha, atr, adx)
+
+    if is_1d:
+        return atr[:, 0], adx[:, 0]
+    return atr, adx
+
+
+def log_kernel_backend():
+    backend = "numba" if NUMBA_AVAILABLE else "numpy fallback"
+    logging.info(f"ATR/ADX kernel backend: {backend}")
@@ -0,0 +1,72 @@
+import datetime
+import functools
+import logging
+import pandas_market_calendars as mcal
+
+from clock import now_est as current_time_est
+
+
+@functools.lru_cache(maxsize=64)
+def is_market_holiday(target_date):
+    """
+    Extracted check to verify if the stock market is officially closed.
+    """
+    nyse = mcal.get_calendar("NYSE")
+    schedule = nyse.schedule(start_date=target_date, end_date=target_date)
+    return schedule.empty
+
+
+def is_market_open():
+    """
+    Extracted market hours validation.
+    Converts current time to US/Eastern to handle Daylight Saving Time automatically,
+    then checks if it's a weekday between 9:30 AM and 4:00 PM EST.
+    """
+    now_est = current_time_est()
+
+    # 5 = Saturday, 6 = Sunday
+    if now_est.weekday() >= 5:
+        return False
+
+    if is_market_holiday(now_est.date()):
+        return False
+
+    market_open = datetime.time(9, 30)
+    market_close = datetime.time(16, 0)
+
+    return market_open <= now_est.time() <= market_close
+
+
+def is_approaching_close():
+    """
+    Extracted check for the final 5 minutes of the trading session.
+    (3:55 PM to 4:00 PM EST)
+    """
+    now_est = current_time_est()
+    market_close_warning = datetime.time(15, 55)
+    market_close = datetime.time(16, 0)
+
+    return market_close_warning <= now_est.time() < market_close
+
+
+def handle_daily_reset(scan_state, current_equity, load_symbols):
+    """
+    Checks if it's a new calendar day and fetches fresh symbols if so.
+    """
+    now_date = current_time_est().date()
+
+    if scan_state["date"] != now_date:
+        logging.info("‼️ NEW DAY DETECTED: Fetching fresh symbols for daily scan...")
+
+        if current_equity:
+            logging.info(f"📊 Daily Starting Equity: ${current_equity:,.2f}")
+
+        scan_state["date"] = now_date
+
+        # scan_state["all_symbols"] = get_sp500_symbols()
+        scan_state["all_symbols"] = load_symbols()
+        scan_state["remaining_symbols"] = list(scan_state["all_symbols"])
+
+    if not scan_state["remaining_symbols"] and scan_state["all_symbols"]:
+        logging.info("‼️ SCAN COMPLETE: Restarting loop from the beginning...")
+        scan_state["remaining_symbols"] = list(scan_state["all_symbols"])
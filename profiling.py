@@ -0,0 +1,282 @@
+import collections
+import cProfile
+import datetime
+import io
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+class _StackSampler:
+    """
+    Samples the profiled thread's Python stack on a background thread and
+    counts collapsed stacks ("section;outer;inner;leaf"), the format
+    flamegraph.pl and speedscope read. The profiler section being sampled is
+    the root frame, so monitor and scan time stay apart in the flame graph.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.section = None
+        self.stacks = collections.Counter()
+        self._active = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def enable(self):
+        self._active.set()
+
+    def disable(self):
+        self._active.clear()
+
+    def stop(self):
+        self._stopped.set()
+        self._active.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._active.wait()
+            if self._stopped.is_set():
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[f"{self.section};{_collapse(frame)}"] += 1
+            time.sleep(self.interval)
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        names.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ScanProfiler:
+    """
+    Profiles the next N trading cycles once armed, either from
+    config.profile_chunks or a SIGUSR1 at runtime. A cycle is one pass of
+    the blocking loop (monitor pass + scan chunk), or one monitor pass or
+    scan chunk of the asyncio loop. Each named section is recorded apart:
+    one .pstats file per section, or the section as the root frame of the
+    collapsed stacks. Results are written to config.profile_dir and the hot
+    spots are logged. While disarmed each section costs a single attribute
+    check.
+    """
+
+    def __init__(self, mode="cprofile", output_dir="profiles", sample_interval=0.005, top_n=15):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Choose one of {PROFILE_MODES}.")
+
+        self.mode = mode
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.default_chunks = 1
+
+        self._remaining = 0
+        self._open_cycles = 0
+        self._requested = 0
+        self._chunks = 0
+        self._profiles = None
+        self._sampler = None
+        self._sections = []
+        self._started = None
+
+    @property
+    def active(self):
+        return self._profiles is not None or self._sampler is not None
+
+    def arm(self, chunks=None):
+        """
+        Requests a profile of the next `chunks` cycles. Safe to call from a
+        signal handler: the session itself starts at the next cycle boundary.
+        """
+        self._requested = chunks or self.default_chunks
+
+    @contextmanager
+    def cycle(self):
+        """
+        Brackets one cycle. Cycles of concurrent asyncio tasks may overlap;
+        the session ends once the last counted cycle has closed.
+        """
+        counted = self._begin_cycle()
+        try:
+            yield
+        finally:
+            if counted:
+                self._end_cycle()
+
+    def _begin_cycle(self):
+        if self._requested and not self.active:
+            self._start(self._requested)
+            self._requested = 0
+
+        if not self._remaining:
+            return False
+        self._remaining -= 1
+        self._open_cycles += 1
+        return True
+
+    def _end_cycle(self):
+        self._open_cycles -= 1
+        self._chunks += 1
+        if not self._remaining and not self._open_cycles:
+            self._finish()
+
+    def section(self, name):
+        """Context manager that records `name` only while a session is running."""
+        if not self.active:
+            return nullcontext()
+        return _ProfiledSection(self, name)
+
+    def _start(self, chunks):
+        self._remaining = chunks
+        self._chunks = 0
+        self._started = time.perf_counter()
+
+        if self.mode == "cprofile":
+            self._profiles = {}
+        else:
+            self._sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+
+        logging.info(f"‼️ Profiling the next {chunks} cycle(s) ({self.mode}).")
+
+    def _enable(self, name):
+        if self._profiles is not None:
+            if name not in self._profiles:
+                self._profiles[name] = cProfile.Profile()
+            self._profiles[name].enable()
+        else:
+            self._sampler.section = name
+            self._sampler.enable()
+
+    def _disable(self, name):
+        if self._profiles is not None:
+            self._profiles[name].disable()
+        else:
+            self._sampler.disable()
+
+    def _enter_section(self, name):
+        # Only the innermost section records, so nested or interleaved
+        # sections never run two profilers on the thread at once
+        if self._sections:
+            self._disable(self._sections[-1])
+        self._sections.append(name)
+        self._enable(name)
+
+    def _exit_section(self):
+        # The session may have finished while this section was running
+        if not self.active or not self._sections:
+            return
+        self._disable(self._sections.pop())
+        if self._sections:
+            self._enable(self._sections[-1])
+
+    def _finish(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, f"scan_{stamp}")
+        elapsed = time.perf_counter() - self._started
+
+        if self._sections:
+            self._disable(self._sections[-1])
+            self._sections = []
+
+        if self._profiles is not None:
+            paths = []
+            summaries = []
+            for name, profile in sorted(self._profiles.items()):
+                paths.append(f"{base}.{name}.pstats")
+                profile.dump_stats(paths[-1])
+                summaries.append(f"[{name}]\n{self._summarize_pstats(profile)}")
+            path = ", ".join(paths) or "(no sections ran)"
+            summary = "\n".join(summaries)
+            self._profiles = None
+        else:
+            self._sampler.stop()
+            path = base + ".folded"
+            with open(path, "w") as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            summary = self._summarize_samples(self._sampler.stacks)
+            self._sampler = None
+
+        logging.info(
+            f"Profile of {self._chunks} cycle(s) over {elapsed:.1f}s written to {path}\n{summary}",
+            extra={"profile_path": path, "profile_chunks": self._chunks},
+        )
+
+    def _summarize_pstats(self, profile):
+        buffer = io.StringIO()
+        stats = pstats.Stats(profile, stream=buffer)
+        stats.strip_dirs().sort_stats("tottime").print_stats(self.top_n)
+        return buffer.getvalue()
+
+    def _summarize_samples(self, stacks):
+        """Top functions by self samples (leaf frame) and by inclusive samples."""
+        total = sum(stacks.values()) or 1
+        self_counts = collections.Counter()
+        inclusive_counts = collections.Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for name in set(frames):
+                inclusive_counts[name] += count
+
+        lines = [f"{total} samples. Top self / inclusive:"]
+        for name, count in self_counts.most_common(self.top_n):
+            lines.append(
+                f"  {100 * count / total:5.1f}% self  "
+                f"{100 * inclusive_counts[name] / total:5.1f}% incl  {name}"
+            )
+        return "\n".join(lines)
+
+
+class _ProfiledSection:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter_section(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit_section()
+        return False
+
+
+def build_profiler(config):
+    profiler = ScanProfiler(
+        mode=config.profile_mode,
+        output_dir=config.profile_dir,
+        sample_interval=config.profile_sample_interval,
+    )
+    profiler.default_chunks = max(config.profile_chunks, 1)
+    if config.profile_chunks:
+        profiler.arm(config.profile_chunks)
+    return profiler
+
+
+def install_profile_signal(profiler, signum=getattr(signal, "SIGUSR1", None)):
+    """
+    `kill -USR1 <pid>` profiles the next config.profile_chunks cycles
+    (one when profiling is otherwise disabled).
+    """
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signum, lambda *_: profiler.arm())
@@ -0,0 +1,238 @@
+import datetime
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from clock import now_est
+from indicators import _stack_panel
+
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+_QUALITY_GATE = None
+
+
+def _sort_and_dedupe(df):
+    """
+    Repairs out-of-order or repeated timestamps. Returns the frame untouched
+    in the common case where the dates are already strictly increasing.
+    """
+    dates = pd.to_datetime(df["date"])
+    if dates.is_monotonic_increasing and dates.is_unique:
+        return df
+
+    order = np.argsort(dates.to_numpy(), kind="stable")
+    df = df.iloc[order]
+    keep = ~pd.Index(dates.iloc[order]).duplicated(keep="last")
+    return df[keep].reset_index(drop=True)
+
+
+def _tail_mask(n_bars, lengths, window):
+    """(bars x symbols) mask of each left-aligned symbol's last `window` bars."""
+    rows = np.arange(n_bars)[:, None]
+    return (rows >= lengths - window) & (rows < lengths)
+
+
+def validate_bars_batch(frames_by_symbol, config):
+    """
+    Rejects or repairs a batch of util.df(bars) frames before the indicator
+    pass. Every check runs column-wise over one left-aligned panel.
+
+    Returns (clean, rejected): the usable frames keyed by symbol, and the
+    rejection reason for every other symbol.
+    """
+    clean = {}
+    rejected = {}
+
+    for sym, df in frames_by_symbol.items():
+        if df is None or df.empty:
+            rejected[sym] = "no_data"
+        else:
+            clean[sym] = _sort_and_dedupe(df)
+
+    if not clean:
+        return clean, rejected
+
+    # Repair: drop a few bad bars (NaN, non-positive or inverted prices)
+    symbols = list(clean)
+    frames = [clean[sym] for sym in symbols]
+    lengths = np.array([len(df) for df in frames])
+    n_bars = lengths.max()
+    in_series = np.arange(n_bars)[:, None] < lengths
+
+    prices = {column: _stack_panel(frames, column) for column in PRICE_COLUMNS}
+    bad = np.zeros((n_bars, len(symbols)), dtype=bool)
+    for values in prices.values():
+        bad |= ~(values > 0)
+    bad |= prices["high"] < prices["low"]
+    bad &= in_series
+
+    bad_counts = bad.sum(axis=0)
+    for j, sym in enumerate(symbols):
+        if bad_counts[j] > config.quality_max_bad_bars:
+            rejected[sym] = "bad_prices"
+            del clean[sym]
+        elif bad_counts[j]:
+            clean[sym] = clean[sym][~bad[: lengths[j], j]].reset_index(drop=True)
+
+    if not clean:
+        return clean, rejected
+
+    symbols = list(clean)
+    frames = [clean[sym] for sym in symbols]
+    lengths = np.array([len(df) for df in frames])
+    n_bars = lengths.max()
+
+    opens = _stack_panel(frames, "open")
+    high = _stack_panel(frames, "high")
+    low = _stack_panel(frames, "low")
+    close = _stack_panel(frames, "close")
+
+    short = lengths < config.sma_slow
+
+    # Unadjusted splits show up as a gap at a split ratio (2:1, 1:10, ...)
+    # between two recent sessions. An ordinary crash or squeeze rarely lands
+    # within tolerance of one, and IBKR back-adjusts older splits.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gap = opens[1:] / close[:-1]
+        gap = np.fmax(gap, 1.0 / gap)
+        at_ratio = np.zeros(gap.shape, dtype=bool)
+        for ratio in config.quality_split_ratios:
+            at_ratio |= np.abs(gap / ratio - 1.0) <= config.quality_split_tolerance
+    recent = _tail_mask(n_bars - 1, lengths - 1, config.quality_split_window)
+    split_jump = (at_ratio & recent).any(axis=0)
+
+    # Near-zero ranges collapse the ATR and blow up the ATR-based share count
+    tail = _tail_mask(n_bars, lengths, config.adx_window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        range_pct = np.where(tail, (high - low) / close, 0.0)
+    flat = range_pct.sum(axis=0) / np.maximum(tail.sum(axis=0), 1) < config.quality_min_range_pct
+
+    checks = [("short_history", short), ("split_jump", split_jump), ("flat_prices", flat)]
+
+    if all("volume" in df.columns for df in frames):
+        volume = _stack_panel(frames, "volume")
+        tail = _tail_mask(n_bars, lengths, config.sma_slow)
+        zero_volume_pct = (tail & (volume <= 0)).sum(axis=0) / np.maximum(tail.sum(axis=0), 1)
+        checks.append(("zero_volume", zero_volume_pct > config.quality_max_zero_volume_pct))
+
+    for reason, failed in checks:
+        for j in np.flatnonzero(failed):
+            sym = symbols[j]
+            if sym in clean:
+                rejected[sym] = reason
+                del clean[sym]
+
+    return clean, rejected
+
+
+def validate_bars(df, config, symbol="?"):
+    """Single-symbol form of validate_bars_batch. Returns (df or None, reason)."""
+    clean, rejected = validate_bars_batch({symbol: df}, config)
+    return clean.get(symbol), rejected.get(symbol)
+
+
+class DataQualityGate:
+    """
+    Runs validate_bars on every fetched series and counts consecutive
+    failures per symbol. Symbols that fail max_failures times in a row are
+    put on a cool-down list, persisted as JSON, and are not fetched again
+    by the scanner until it expires.
+    """
+
+    def __init__(self, max_failures=3, cooldown_days=5, path=None):
+        self.max_failures = max_failures
+        self.cooldown_days = cooldown_days
+        self.path = path
+        self._failures = {}
+        self._cooldown = {}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._cooldown = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"‼️ Could not read data-quality cool-down list {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._cooldown, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def is_cooling_down(self, symbol):
+        entry = self._cooldown.get(symbol)
+        if entry is None:
+            return False
+        return now_est().date() < datetime.date.fromisoformat(entry["until"])
+
+    def filter_symbols(self, symbols):
+        """Drops symbols that are still cooling down."""
+        return [sym for sym in symbols if not self.is_cooling_down(sym)]
+
+    def check(self, symbol, df, config, held=False):
+        """
+        Returns the (possibly repaired) frame, or None when it is rejected.
+        A held symbol's reject is recorded but its frame is still returned,
+        so bad data can delay an entry but never suppress an exit.
+        """
+        clean, reason = validate_bars(df, config, symbol)
+        if reason is None:
+            self._failures.pop(symbol, None)
+            return clean
+
+        self.record_failure(symbol, reason)
+        if held and reason != "no_data":
+            logging.warning(f"⚠️ {symbol} is held; evaluating its exit despite {reason}.")
+            return _sort_and_dedupe(df)
+        return None
+
+    def check_batch(self, frames_by_symbol, config):
+        """
+        Batch form of check(). Returns the usable (possibly repaired) frames;
+        every rejected symbol is recorded as a failure.
+        """
+        clean, rejected = validate_bars_batch(frames_by_symbol, config)
+        for symbol in clean:
+            self._failures.pop(symbol, None)
+        for symbol, reason in rejected.items():
+            self.record_failure(symbol, reason)
+        return clean
+
+    def record_failure(self, symbol, reason):
+        failures = self._failures.get(symbol, 0) + 1
+        self._failures[symbol] = failures
+        logging.info(
+            f"Data-quality reject: {symbol} ({reason}), failure {failures}/{self.max_failures}",
+            extra={"event": "quality_reject", "symbol": symbol, "reason": reason},
+        )
+
+        if failures >= self.max_failures:
+            until = now_est().date() + datetime.timedelta(days=self.cooldown_days)
+            self._cooldown[symbol] = {"until": until.isoformat(), "reason": reason}
+            self._failures.pop(symbol, None)
+            self._save()
+            logging.warning(
+                f"⚠️ {symbol} failed data-quality checks {failures} times in a row "
+                f"({reason}). Cooling down until {until}."
+            )
+
+
+def get_quality_gate(config):
+    """Process-wide gate shared by every strategy, like the bar stores."""
+    global _QUALITY_GATE
+    if _QUALITY_GATE is None:
+        _QUALITY_GATE = DataQualityGate(
+            max_failures=config.quality_max_failures,
+            cooldown_days=config.quality_cooldown_days,
+            path=config.quality_cooldown_file,
+        )
+    return _QUALITY_GATE
@@ -0,0 +1,664 @@
+import asyncio
+import datetime
+import logging
+import math
+import os
+import selectors
+import time
+
+import numpy as np
+import pandas as pd
+from eventkit import Event
+from ib_insync import (
+    BarData,
+    CommissionReport,
+    Execution,
+    Fill,
+    OrderStatus,
+    Position,
+    Stock,
+    Ticker,
+    Trade,
+    util,
+)
+from ib_insync.objects import AccountValue
+
+from archive import BarArchive, duration_start
+from async_loop import run_async_main_loop
+from clock import EASTERN, SimulatedClock, set_clock
+
+
+REPLAY_ACCOUNT = "DU_REPLAY"
+MARKET_CLOSE = datetime.time(16, 0)
+
+
+class ReplayBarSource:
+    """
+    Daily bars for replay, read from `{cache_dir}/{symbol}.pkl`. Each file
+    holds a util.df(bars) frame covering the replay window plus lookback.
+    When cache_dir is a BarArchive, bars are read from the archive instead.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._frames = {}
+        self._archive = None
+        if os.path.exists(os.path.join(cache_dir, "index.json")):
+            self._archive = BarArchive(cache_dir)
+
+    def _path(self, symbol):
+        return os.path.join(self.cache_dir, f"{symbol.replace(' ', '_')}.pkl")
+
+    def cached_symbols(self):
+        if self._archive is not None:
+            return self._archive.symbols()
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return sorted(
+            name[:-4].replace("_", " ")
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".pkl")
+        )
+
+    def frame(self, symbol):
+        if symbol not in self._frames:
+            path = self._path(symbol)
+            if self._archive is not None:
+                df = self._archive.read_frame(symbol) if symbol in self._archive else None
+            else:
+                df = pd.read_pickle(path) if os.path.exists(path) else None
+            if df is not None and not df.empty:
+                df = df.reset_index(drop=True)
+                df.attrs["days"] = pd.to_datetime(df["date"]).to_numpy("datetime64[D]")
+            self._frames[symbol] = df
+        return self._frames[symbol]
+
+    def bars_until(self, symbol, as_of, duration_str, session_open=False):
+        """
+        Rows whose date falls within duration_str ending at as_of (inclusive).
+        While as_of's session is still open its close is not known yet, so
+        that row is served as a partial bar at the session's opening price.
+        """
+        df = self.frame(symbol)
+        if df is None or df.empty:
+            return None
+
+        days = df.attrs["days"]
+        start = np.datetime64(duration_start(as_of, duration_str), "D")
+        lo = np.searchsorted(days, start, side="right")
+        hi = np.searchsorted(days, np.datetime64(as_of, "D"), side="right")
+        window = df.iloc[lo:hi]
+
+        if session_open and hi > lo and days[hi - 1] == np.datetime64(as_of, "D"):
+            window = window.copy()
+            window.iloc[-1] = _opening_bar(window.iloc[-1])
+        return window
+
+    def bar_on(self, symbol, as_of):
+        df = self.frame(symbol)
+        if df is None or df.empty:
+            return None
+
+        days = df.attrs["days"]
+        i = np.searchsorted(days, np.datetime64(as_of, "D"), side="right") - 1
+        if i < 0:
+            return None
+        return df.iloc[i]
+
+    def populate(self, ib, symbols, start, end, lookback_duration):
+        """
+        Downloads any symbol missing from the cache from a live connection,
+        covering the replay window plus the strategy lookback.
+        """
+        if self._archive is not None:
+            raise ValueError("Populate a BarArchive through data.fetch_historical_data.")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Requests longer than a year must be whole years
+        first_day = duration_start(start, lookback_duration)
+        years = max(math.ceil((end - first_day).days / 365), 1)
+        end_str = f"{end.strftime('%Y%m%d')} 23:59:59"
+
+        for symbol in symbols:
+            if os.path.exists(self._path(symbol)):
+                continue
+
+            logging.info(f"Caching replay bars for {symbol}...")
+            bars = ib.reqHistoricalData(
+                Stock(symbol, "SMART", "USD"),
+                endDateTime=end_str,
+                durationStr=f"{years} Y",
+                barSizeSetting="1 day",
+                whatToShow="TRADES",
+                useRTH=True,
+                formatDate=1,
+            )
+            df = pd.DataFrame() if not bars else util.df(bars)
+            df.to_pickle(self._path(symbol))
+            ib.sleep(2)
+
+
+def _opening_bar(bar):
+    """A session's bar as seen at the open: one price, no volume yet."""
+    bar = bar.copy()
+    for column in ("high", "low", "close", "average"):
+        if column in bar.index:
+            bar[column] = bar["open"]
+    bar["volume"] = 0
+    if "barCount" in bar.index:
+        bar["barCount"] = 0
+    return bar
+
+
+class _ReqIdSource:
+    def __init__(self):
+        self._next_id = 1
+
+    def getReqId(self):
+        self._next_id += 1
+        return self._next_id
+
+
+class ReplayIB:
+    """
+    Stand-in for ib_insync.IB that serves cached bars as of the simulated
+    clock and simulates a cash account. Only the calls the bot makes are
+    implemented. sleep() advances simulated time instead of blocking.
+
+    Until the session closes, today's bar is only known up to its open, so
+    history requests end in a partial bar and fills are immediate at the
+    opening price: marketable limits fill at their limit, market orders at
+    the open. Resting STP/TRAIL orders are checked against each new day's low.
+    """
+
+    def __init__(self, clock, bars, starting_cash=100000.0, stats=None):
+        self.clock = clock
+        self.bars = bars
+        self.cash = starting_cash
+        self.stats = stats
+        self.client = _ReqIdSource()
+
+        self.errorEvent = Event("errorEvent")
+        self.accountValueEvent = Event("accountValueEvent")
+        self.disconnectedEvent = Event("disconnectedEvent")
+        self.execDetailsEvent = Event("execDetailsEvent")
+        self.orderStatusEvent = Event("orderStatusEvent")
+
+        self._connected = False
+        self._positions = {}
+        self._trades = []
+        self._tickers = {}
+        self._current_date = clock.now().date()
+
+    # --- connection -----------------------------------------------------
+
+    def isConnected(self):
+        return self._connected
+
+    def connect(self, *args, **kwargs):
+        self._connected = True
+        self._emit_account_values()
+
+    async def connectAsync(self, *args, **kwargs):
+        self.connect()
+        return self
+
+    def disconnect(self):
+        self._connected = False
+        self.disconnectedEvent.emit()
+
+    def managedAccounts(self):
+        return [REPLAY_ACCOUNT]
+
+    def sleep(self, seconds=0):
+        self.clock.sleep(seconds)
+        today = self.clock.now().date()
+        if today != self._current_date:
+            self._current_date = today
+            self._on_new_day()
+        return True
+
+    # --- account --------------------------------------------------------
+
+    def _session_open(self):
+        return self.clock.now().time() < MARKET_CLOSE
+
+    def _price(self, symbol):
+        bar = self.bars.bar_on(symbol, self._current_date)
+        if bar is None:
+            return None
+        if self._session_open() and pd.Timestamp(bar["date"]).date() == self._current_date:
+            return float(bar["open"])
+        return float(bar["close"])
+
+    def net_liquidation(self):
+        equity = self.cash
+        for symbol, (quantity, avg_cost) in self._positions.items():
+            price = self._price(symbol)
+            equity += quantity * (price if price is not None else avg_cost)
+        return equity
+
+    def accountValues(self, account=""):
+        values = {
+            "NetLiquidation": (f"{self.net_liquidation():.2f}", "USD"),
+            "AvailableFunds": (f"{self.cash:.2f}", "USD"),
+            "AccountType": ("CASH", ""),
+        }
+        return [
+            AccountValue(REPLAY_ACCOUNT, tag, value, currency, "")
+            for tag, (value, currency) in values.items()
+        ]
+
+    def _emit_account_values(self):
+        for value in self.accountValues():
+            self.accountValueEvent.emit(value)
+
+    def reqAccountUpdates(self, account=""):
+        self._emit_account_values()
+
+    def reqAccountUpdatesMulti(self, account="", modelCode=""):
+        self._emit_account_values()
+
+    def positions(self, account=""):
+        return [
+            Position(REPLAY_ACCOUNT, Stock(symbol, "SMART", "USD"), quantity, avg_cost)
+            for symbol, (quantity, avg_cost) in self._positions.items()
+            if quantity != 0
+        ]
+
+    # --- market data ----------------------------------------------------
+
+    def reqHistoricalData(self, contract, endDateTime="", durationStr="1 Y",
+                          barSizeSetting="1 day", **kwargs):
+        if barSizeSetting != "1 day":
+            raise ValueError("Replay only serves daily bars.")
+
+        as_of = self._current_date
+        if endDateTime:
+            as_of = min(as_of, datetime.datetime.strptime(endDateTime[:8], "%Y%m%d").date())
+
+        df = self.bars.bars_until(
+            contract.symbol,
+            as_of,
+            durationStr,
+            session_open=as_of == self._current_date and self._session_open(),
+        )
+        if df is None or df.empty:
+            return []
+
+        return [
+            BarData(
+                date=row.date,
+                open=row.open,
+                high=row.high,
+                low=row.low,
+                close=row.close,
+                volume=row.volume,
+                average=getattr(row, "average", row.close),
+                barCount=getattr(row, "barCount", 0),
+            )
+            for row in df.itertuples(index=False)
+        ]
+
+    async def reqHistoricalDataAsync(self, contract, **kwargs):
+        return self.reqHistoricalData(contract, **kwargs)
+
+    def qualifyContracts(self, *contracts):
+        return list(contracts)
+
+    def reqMktData(self, contract, *args, **kwargs):
+        ticker = self._tickers.get(contract.symbol)
+        if ticker is None:
+            ticker = Ticker(contract=contract)
+            self._tickers[contract.symbol] = ticker
+            self._update_ticker(ticker)
+        return ticker
+
+    def cancelMktData(self, contract):
+        self._tickers.pop(contract.symbol, None)
+
+    def _update_ticker(self, ticker):
+        price = self._price(ticker.contract.symbol)
+        if price is None:
+            return
+        ticker.last = price
+        ticker.close = price
+        ticker.updateEvent.emit(ticker)
+
+    # --- orders ---------------------------------------------------------
+
+    def openTrades(self):
+        return [t for t in self._trades if not t.isDone()]
+
+    def placeOrder(self, contract, order):
+        if not order.orderId:
+            order.orderId = self.client.getReqId()
+
+        trade = Trade(
+            contract=contract,
+            order=order,
+            orderStatus=OrderStatus(
+                orderId=order.orderId, status="Submitted", remaining=order.totalQuantity
+            ),
+        )
+        self._trades.append(trade)
+        if self.stats is not None:
+            self.stats.record_order()
+        self.orderStatusEvent.emit(trade)
+
+        if order.orderType == "TRAIL":
+            price = self._price(contract.symbol)
+            if not order.trailStopPrice or order.trailStopPrice != order.trailStopPrice:
+                order.trailStopPrice = price - order.auxPrice
+        elif order.orderType in ("LMT", "MKT"):
+            self._try_fill(trade)
+        return trade
+
+    def cancelOrder(self, order):
+        for trade in self._trades:
+            if trade.order is order and not trade.isDone():
+                self._set_status(trade, "Cancelled")
+                # IBKR cancels children with an unfilled parent
+                for child in self._trades:
+                    if child.order.parentId == order.orderId and not child.isDone():
+                        self._set_status(child, "Cancelled")
+        return None
+
+    def _set_status(self, trade, status):
+        trade.orderStatus.status = status
+        self.orderStatusEvent.emit(trade)
+
+    def _try_fill(self, trade, price=None):
+        order = trade.order
+        symbol = trade.contract.symbol
+        market = self._price(symbol) if price is None else price
+        if market is None:
+            return
+
+        if order.orderType == "LMT":
+            marketable = (
+                order.lmtPrice >= market if order.action == "BUY" else order.lmtPrice <= market
+            )
+            if not marketable:
+                return
+            fill_price = order.lmtPrice
+        else:
+            fill_price = market
+
+        quantity = float(order.totalQuantity)
+        signed = quantity if order.action == "BUY" else -quantity
+        held, avg_cost = self._positions.get(symbol, (0.0, 0.0))
+
+        if order.action == "SELL":
+            quantity = min(quantity, held)
+            signed = -quantity
+            if quantity <= 0:
+                self._set_status(trade, "Cancelled")
+                return
+        elif quantity * fill_price > self.cash:
+            self._set_status(trade, "Cancelled")
+            return
+
+        new_held = held + signed
+        if order.action == "BUY":
+            avg_cost = (held * avg_cost + quantity * fill_price) / new_held
+        self._positions[symbol] = (new_held, avg_cost)
+        if new_held == 0:
+            del self._positions[symbol]
+        self.cash -= signed * fill_price
+
+        trade.orderStatus.status = "Filled"
+        trade.orderStatus.filled = quantity
+        trade.orderStatus.remaining = 0
+        trade.orderStatus.avgFillPrice = fill_price
+
+        fill = Fill(
+            contract=trade.contract,
+            execution=Execution(
+                side="BOT" if order.action == "BUY" else "SLD",
+                shares=quantity,
+                price=fill_price,
+                time=self.clock.now(),
+            ),
+            commissionReport=CommissionReport(),
+            time=self.clock.now(),
+        )
+        trade.fills.append(fill)
+        trade.fillEvent.emit(trade, fill)
+        self.execDetailsEvent.emit(trade, fill)
+        self.orderStatusEvent.emit(trade)
+        self._emit_account_values()
+
+    def _on_new_day(self):
+        """Checks resting stops against the new bar and refreshes streamed prices."""
+        for trade in self.openTrades():
+            order = trade.order
+            if order.orderType not in ("STP", "TRAIL"):
+                continue
+
+            bar = self.bars.bar_on(trade.contract.symbol, self._current_date)
+            if bar is None:
+                continue
+
+            if order.orderType == "TRAIL":
+                order.trailStopPrice = max(
+                    order.trailStopPrice, float(bar["high"]) - order.auxPrice
+                )
+            stop = order.trailStopPrice if order.orderType == "TRAIL" else order.auxPrice
+
+            if float(bar["low"]) <= stop:
+                self._try_fill(trade, price=min(stop, float(bar["open"])))
+
+        for ticker in list(self._tickers.values()):
+            self._update_ticker(ticker)
+
+        self._emit_account_values()
+
+
+class _SimulatedSelector(selectors.DefaultSelector):
+    """
+    Selector that never blocks: when the loop has nothing ready, the wait
+    until its next timer is spent on the simulated clock through ib.sleep(),
+    which also rolls the replay over to each new session.
+    """
+
+    def __init__(self, ib):
+        super().__init__()
+        self._ib = ib
+
+    def select(self, timeout=None):
+        if timeout:
+            self._ib.sleep(timeout)
+        return super().select(0)
+
+
+class SimulatedEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop on simulated time, so asyncio.sleep() in the main-loop tasks
+    advances the replay clock instead of waiting, and only once every task
+    is idle.
+    """
+
+    def __init__(self, ib):
+        super().__init__(_SimulatedSelector(ib))
+        self._clock = ib.clock
+        self._origin = ib.clock.now()
+        # datetime arithmetic is only exact to the microsecond
+        self._clock_resolution = 1e-6
+
+    def time(self):
+        return (self._clock.now() - self._origin).total_seconds()
+
+    def run_in_executor(self, executor, func, *args):
+        """
+        Runs blocking work inline, so it takes no simulated time and the
+        replay clock never jumps ahead while a thread is still busy.
+        """
+        future = self.create_future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ReplayStats:
+    """
+    Wall-clock throughput and decision latency of the real scheduling loop
+    while it runs against simulated time.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.cycles = 0
+        self.cycle_seconds = []
+        self.decision_latencies = []
+        # Start times of the cycles in progress; async monitor and scan overlap
+        self._open_cycles = []
+        self._wall_started = time.perf_counter()
+        self._sim_started = clock.now()
+
+    def start_cycle(self):
+        started = time.perf_counter()
+        self._open_cycles.append(started)
+        return started
+
+    def end_cycle(self, started):
+        self.cycles += 1
+        self.cycle_seconds.append(time.perf_counter() - started)
+        self._open_cycles.remove(started)
+
+    def record_order(self):
+        # Latency from the start of the latest cycle, the one placing the order
+        if self._open_cycles:
+            self.decision_latencies.append(time.perf_counter() - self._open_cycles[-1])
+
+    def report(self, data_plane):
+        wall = time.perf_counter() - self._wall_started
+        simulated = (self.clock.now() - self._sim_started).total_seconds()
+        cycle_ms = np.array(self.cycle_seconds) * 1000
+        latency_ms = np.array(self.decision_latencies) * 1000
+
+        logging.info("===== REPLAY REPORT =====")
+        logging.info(
+            f"Simulated {simulated / 86400:.1f} days in {wall:.1f}s wall "
+            f"({simulated / max(wall, 1e-9):,.0f}x real time)"
+        )
+        logging.info(
+            f"Cycles: {self.cycles} | Symbols fetched: {data_plane.fetches} "
+            f"({data_plane.fetches / max(wall, 1e-9):,.1f}/s)"
+        )
+        if len(cycle_ms):
+            logging.info(
+                f"Cycle wall time ms: p50={np.percentile(cycle_ms, 50):.1f} "
+                f"p95={np.percentile(cycle_ms, 95):.1f} max={cycle_ms.max():.1f}"
+            )
+        if len(latency_ms):
+            logging.info(
+                f"Decision latency ms ({len(latency_ms)} orders): "
+                f"p50={np.percentile(latency_ms, 50):.1f} "
+                f"p95={np.percentile(latency_ms, 95):.1f}"
+            )
+
+
+class _TimedRunner:
+    """
+    Wraps a StrategyRunner so each trading cycle (or, on the asyncio loop,
+    each monitor pass and scan chunk) is timed for ReplayStats.
+    """
+
+    def __init__(self, runner, stats):
+        self._runner = runner
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._runner, name)
+
+    def run_cycle(self, ib, scan_state, chunk_size=20):
+        started = self._stats.start_cycle()
+        try:
+            self._runner.run_cycle(ib, scan_state, chunk_size)
+        finally:
+            self._stats.end_cycle(started)
+
+    async def monitor_async(self, ib):
+        started = self._stats.start_cycle()
+        try:
+            await self._runner.monitor_async(ib)
+        finally:
+            self._stats.end_cycle(started)
+
+    async def scan_chunk_async(self, ib, scan_state, *args, **kwargs):
+        started = self._stats.start_cycle()
+        try:
+            await self._runner.scan_chunk_async(ib, scan_state, *args, **kwargs)
+        finally:
+            self._stats.end_cycle(started)
+
+
+def run_replay(runner, start, end, speed=0, symbols=None, cache_dir="replay_cache",
+               live_ib=None, main_loop=run_async_main_loop):
+    """
+    Drives the live main loop over [start, end] on a simulated clock against
+    cached daily bars. Pass a connected live_ib to download missing symbols.
+    The asyncio loop runs on a SimulatedEventLoop; pass main_loop to replay
+    the blocking loop instead.
+    """
+    bars = ReplayBarSource(cache_dir)
+    if live_ib is not None and symbols:
+        bars.populate(
+            live_ib, symbols, start, end, runner.connection_config.lookback_duration
+        )
+
+    universe = symbols or bars.cached_symbols()
+    if not universe:
+        logging.error(f"‼️ No replay bars found in {cache_dir}. Nothing to replay.")
+        return
+
+    for config in runner.configs:
+        if config.bar_size != "1 day":
+            raise ValueError("Replay only supports daily bar strategies.")
+        # Everything trades in the one simulated account, off the replay bars
+        config.account = None
+        config.bar_archive_dir = None
+        config.quality_cooldown_file = None
+        config.scan_workers = 0
+
+    # The runner built its worker pool from the live settings; replay scans in-process
+    if runner.sharded_scan is not None:
+        runner.sharded_scan.stop()
+        runner.sharded_scan = None
+
+    clock = SimulatedClock(
+        start=datetime.datetime.combine(start, datetime.time(9, 25), tzinfo=EASTERN),
+        end=datetime.datetime.combine(end, datetime.time(16, 5), tzinfo=EASTERN),
+        speed=speed,
+    )
+    set_clock(clock)
+
+    stats = ReplayStats(clock)
+    ib = ReplayIB(clock, bars, stats=stats)
+    scan_state = {"date": None, "all_symbols": [], "remaining_symbols": []}
+
+    logging.info(
+        f"Starting replay {start} -> {end} over {len(universe)} symbols "
+        f"at {'max' if not speed else f'{speed:g}x'} speed..."
+    )
+    loop = SimulatedEventLoop(ib)
+    asyncio.set_event_loop(loop)
+    try:
+        main_loop(
+            ib,
+            _TimedRunner(runner, stats),
+            scan_state,
+            load_symbols=lambda: list(universe),
+            should_continue=lambda: not clock.finished,
+        )
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+    stats.report(runner.data_plane)
+    logging.info(
+        f"Replay finished. Equity ${ib.net_liquidation():,.2f}, "
+        f"{len(ib.positions())} open positions."
+    )
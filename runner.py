@@ -0,0 +1,223 @@
+import asyncio
+import logging
+
+from bar_store import is_intraday_bar_size
+from data_plane import SharedDataPlane
+from execution import get_net_liquidation_value, get_current_positions
+from profiling import build_profiler
+from sharding import ShardedScan
+from scanner import (
+    run_multi_strategy_buy_scan,
+    monitor_open_positions,
+    open_monitor_pass,
+    monitor_symbol,
+    next_scan_chunk,
+    open_scan_books,
+    scan_symbol,
+    symbols_to_fetch,
+    route_buy_signals,
+)
+from stops import StopBook
+
+
+class StrategyRunner:
+    """
+    Hosts several StrategyConfig instances in one process. All of them read
+    from a single SharedDataPlane, while sizing, positions and orders stay
+    scoped to each strategy's own account.
+    """
+
+    def __init__(self, configs, data_plane=None):
+        if not configs:
+            raise ValueError("StrategyRunner needs at least one StrategyConfig.")
+
+        self.configs = list(configs)
+        self._share_minute_store()
+        self.data_plane = data_plane or SharedDataPlane(
+            self.connection_config.max_concurrent_requests
+        )
+        self.stop_books = {
+            config.strategy_name: StopBook(config)
+            for config in self.configs
+            if config.stop_mode == "local"
+        }
+        self.profiler = build_profiler(self.connection_config)
+        self.sharded_scan = None
+        if self.connection_config.scan_workers:
+            self.sharded_scan = ShardedScan(self.configs)
+        self._validate_strategies()
+
+    @property
+    def connection_config(self):
+        """All strategies share one broker session, configured by the first entry."""
+        return self.configs[0]
+
+    def _validate_strategies(self):
+        """
+        Position books are keyed by IBKR account, so two strategies on the same
+        account would sell each other's holdings.
+        """
+        names = [config.strategy_name for config in self.configs]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate strategy_name in runner configs: {names}")
+
+        accounts = [config.account for config in self.configs]
+        if len(self.configs) > 1 and len(set(accounts)) != len(accounts):
+            logging.warning(
+                f"‼️ WARNING: Multiple strategies share an account ({accounts}). "
+                "Their position books and funds will overlap."
+            )
+
+    def _share_minute_store(self):
+        """
+        When daily and intraday strategies run side by side, daily bars are
+        built from the same 1-minute download instead of a second request.
+        """
+        if not any(is_intraday_bar_size(config.bar_size) for config in self.configs):
+            return
+        for config in self.configs:
+            if not is_intraday_bar_size(config.bar_size):
+                config.daily_from_minute_store = True
+
+    def refresh_account_capital(self, ib):
+        """
+        Sizes each strategy off its own account equity.
+        Returns the combined equity across all hosted accounts.
+        """
+        total_equity = 0.0
+        seen_accounts = set()
+
+        for config in self.configs:
+            equity = get_net_liquidation_value(ib, config.account)
+            if not equity:
+                continue
+
+            config.account_capital = equity
+            if config.account not in seen_accounts:
+                seen_accounts.add(config.account)
+                total_equity += equity
+
+        return total_equity or None
+
+    def run_cycle(self, ib, scan_state, chunk_size=20):
+        """
+        Priority 1 (Risk Management) for every strategy first, then one shared
+        scan chunk fanned out to all of them.
+        """
+        self.data_plane.begin_cycle()
+        with self.profiler.cycle():
+            with self.profiler.section("monitor"):
+                for config in self.configs:
+                    monitor_open_positions(
+                        ib, config, self.data_plane, self.stop_books.get(config.strategy_name)
+                    )
+
+            if self.sharded_scan is not None:
+                self.route_sharded_scan(ib, scan_state)
+                ib.sleep(5)
+            elif scan_state["remaining_symbols"]:
+                with self.profiler.section("scan"):
+                    run_multi_strategy_buy_scan(
+                        ib,
+                        self.configs,
+                        scan_state,
+                        chunk_size,
+                        self.data_plane,
+                        self.stop_books,
+                    )
+
+                # Small delay between chunks to let the IBKR data farm breathe
+                ib.sleep(5)
+
+    def route_sharded_scan(self, ib, scan_state):
+        """
+        Keeps the scan workers busy and places orders for the signals they
+        have streamed back since the last cycle.
+        """
+        self.sharded_scan.dispatch(scan_state)
+        route_buy_signals(ib, self.configs, self.sharded_scan.drain(), self.stop_books)
+
+    async def monitor_async(self, ib):
+        """
+        Asyncio form of the monitor pass. Bars for every held symbol are
+        downloaded concurrently, then each position is evaluated off the cache.
+        Only the held symbols are invalidated, so a scan chunk that is still
+        being fetched keeps its cached bars.
+        """
+        with self.profiler.cycle():
+            for config in self.configs:
+                stop_book = self.stop_books.get(config.strategy_name)
+                positions = open_monitor_pass(ib, config, stop_book)
+                if not positions:
+                    continue
+
+                self.data_plane.invalidate(positions)
+                await self.data_plane.prefetch_async(ib, [config], list(positions))
+                for sym, quantity in positions.items():
+                    with self.profiler.section("monitor"):
+                        monitor_symbol(ib, sym, quantity, config, self.data_plane, stop_book)
+                    await asyncio.sleep(0)
+
+    async def scan_chunk_async(self, ib, scan_state, chunk_size=20, pause=2, keep_going=None):
+        """
+        Asyncio form of one scan chunk. The chunk's bars are awaited one
+        symbol at a time, with the pause between symbols yielding to the other
+        tasks, then indicators are computed for the whole chunk in one batch.
+        Once keep_going() turns False it stops fetching and evaluating, and
+        returns every symbol not yet evaluated to the queue.
+        """
+        if self.sharded_scan is not None:
+            self.route_sharded_scan(ib, scan_state)
+            return
+
+        if not scan_state["remaining_symbols"]:
+            return
+
+        chunk = next_scan_chunk(scan_state, chunk_size, self.connection_config)
+        if not chunk:
+            return
+
+        self.data_plane.begin_cycle()
+        with self.profiler.cycle():
+            books = open_scan_books(ib, self.configs)
+
+            symbols = symbols_to_fetch(self.configs, chunk, books)
+            for sym in symbols:
+                if keep_going is not None and not keep_going():
+                    scan_state["remaining_symbols"][:0] = chunk[chunk.index(sym):]
+                    chunk = chunk[: chunk.index(sym)]
+                    break
+                await self.data_plane.prefetch_async(ib, self.configs, [sym])
+                await asyncio.sleep(pause)
+
+            with self.profiler.section("scan"):
+                self.data_plane.warm_indicators(self.configs, chunk)
+
+            # The gate also closes for the end-of-day order sweep, so no order
+            # may go out once it has; unevaluated symbols go back to the queue
+            for i, sym in enumerate(chunk):
+                if keep_going is not None and not keep_going():
+                    scan_state["remaining_symbols"][:0] = chunk[i:]
+                    return
+                with self.profiler.section("scan"):
+                    scan_symbol(
+                        ib, sym, self.configs, books, scan_state, self.data_plane, self.stop_books
+                    )
+                await asyncio.sleep(0)
+
+    def on_fill(self, ib, trade):
+        """
+        Releases the stops of positions an exit has just closed, instead of
+        waiting for the next monitor pass. BUY fills are skipped: IBKR sends
+        execDetails before the position update, so syncing then would drop
+        the stop that was just armed for the new position.
+        """
+        if trade.order.action != "SELL":
+            return
+
+        for config in self.configs:
+            if config.account and trade.order.account != config.account:
+                continue
+            stop_book = self.stop_books.get(config.strategy_name)
+            if stop_book is not None:
+                stop_book.sync_positions(ib, get_current_positions(ib, config.account))
@@ -1,39 +1,91 @@
-from strategy import check_current_signal
+import logging
+
+from strategy import check_current_signal, size_position
+from quality import get_quality_gate
 from execution import (
     get_available_funds,
     get_current_positions,
     get_pending_shares,
     execute_limit_order,
     execute_market_order,
+    cancel_protective_stops,
 )
 
 
-def _process_buy_candidate(ib, sym, config, available_funds):
+def _trailing_stop_order_args(config, signal_data):
+    """
+    Keyword arguments that make execute_limit_order attach a native
+    trailing stop, when the strategy is configured for broker-side exits.
+    """
+    if config.stop_mode != "native" or "atr" not in signal_data:
+        return {}
+    return {
+        "trailing_amount": signal_data["atr"] * config.atr_stop_multiplier,
+        "trailing_stop_price": signal_data["stop"],
+    }
+
+
+def _process_buy_candidate(
+    ib, sym, config, available_funds, data_plane=None, stop_book=None
+):
     """
     Returns the updated available_funds after any purchases.
     """
-    pending_buys = get_pending_shares(ib, sym, "BUY")
-    if pending_buys > 0:
-        print(f"Skipping BUY for {sym}: {pending_buys} shares are already pending.")
+    if _has_pending_buy(ib, sym, config):
         return available_funds
 
-    signal_data = check_current_signal(ib, sym, config)
+    signal_data = check_current_signal(ib, sym, config, data_plane)
+    return execute_buy_signal(ib, sym, config, available_funds, signal_data, stop_book)
+
+
+def _has_pending_buy(ib, sym, config):
+    pending_buys = get_pending_shares(ib, sym, "BUY", config.account)
+    if pending_buys > 0:
+        logging.info(
+            f"Skipping BUY for {sym}: {pending_buys} shares are already pending."
+        )
+        return True
+    return False
+
 
+def execute_buy_signal(ib, sym, config, available_funds, signal_data, stop_book=None):
+    """
+    Acts on an already evaluated signal, whether it was computed in-process
+    or streamed back from a scan worker. Returns the updated available_funds.
+    """
     if signal_data:
-        print(f"SCANNED: {sym} | Current Price: ${signal_data['price']:.2f}")
+        logging.info(
+            f"SCANNED: {sym} [{config.strategy_name}] | "
+            f"Current Price: ${signal_data['price']:.2f}",
+            extra={
+                "event": "scanned",
+                "symbol": sym,
+                "strategy": config.strategy_name,
+                "price": float(signal_data["price"]),
+                "action": signal_data["action"],
+            },
+        )
 
         if signal_data["action"] == "BUY":
             estimated_cost = signal_data["shares"] * signal_data["price"]
 
             if available_funds >= estimated_cost:
-                print(f"🚨 EXECUTING BUY: {sym}")
+                logging.info(f"🚨 EXECUTING BUY: {sym} [{config.strategy_name}]")
                 execute_limit_order(
-                    ib, sym, "BUY", signal_data["shares"], signal_data["price"]
+                    ib,
+                    sym,
+                    "BUY",
+                    signal_data["shares"],
+                    signal_data["price"],
+                    config.account,
+                    **_trailing_stop_order_args(config, signal_data),
                 )
+                if stop_book is not None:
+                    stop_book.update_from_signal(ib, sym, signal_data)
 
                 available_funds -= estimated_cost
             else:
-                print(
+                logging.warning(
                     f"⚠️ INSUFFICIENT FUNDS to buy {sym}. Cost: ${estimated_cost:.2f}, "
                     f"Available: ${available_funds:.2f}"
                 )
@@ -41,76 +93,253 @@ def _process_buy_candidate(ib, sym, config, available_funds):
     return available_funds
 
 
-def run_daily_buy_scan(ib, config, scan_state, chunk_size=20):
-    if not scan_state["remaining_symbols"]:
-        return
-
+def _take_scan_chunk(scan_state, chunk_size):
+    """
+    Pops the next chunk of symbols off the shared daily scan queue.
+    """
     chunk = scan_state["remaining_symbols"][:chunk_size]
     scan_state["remaining_symbols"] = scan_state["remaining_symbols"][chunk_size:]
+    return chunk
 
-    print(
-        f"\n--- SCANNING BUY CHUNK ({len(chunk)} symbols) | "
-        f"{len(scan_state['remaining_symbols'])} left today ---"
+
+def _is_connection_error(e):
+    return (
+        isinstance(e, ConnectionError)
+        or "socket" in str(e).lower()
+        or "disconnect" in str(e).lower()
     )
 
-    available_funds = get_available_funds(ib)
-    current_positions = get_current_positions(ib)
-    print(f"Available Funds: ${available_funds:.2f}")
 
+def run_daily_buy_scan(
+    ib, config, scan_state, chunk_size=20, data_plane=None, stop_book=None
+):
+    stop_books = {config.strategy_name: stop_book} if stop_book else None
+    run_multi_strategy_buy_scan(
+        ib, [config], scan_state, chunk_size, data_plane, stop_books
+    )
+
+
+def next_scan_chunk(scan_state, chunk_size, config):
+    """
+    Takes the next chunk and drops symbols cooling down after repeated
+    data-quality rejects, so they are never fetched.
+    """
+    chunk = _take_scan_chunk(scan_state, chunk_size)
+    chunk = get_quality_gate(config).filter_symbols(chunk)
+    if chunk:
+        logging.info(
+            f"--- SCANNING BUY CHUNK ({len(chunk)} symbols) | "
+            f"{len(scan_state['remaining_symbols'])} left today ---"
+        )
+    return chunk
+
+
+def open_scan_books(ib, configs):
+    """Snapshot of each strategy's funds and holdings for one scan chunk."""
+    books = {}
+    for config in configs:
+        books[config.strategy_name] = {
+            "funds": get_available_funds(ib, config.account),
+            "positions": get_current_positions(ib, config.account),
+        }
+        logging.info(
+            f"Available Funds [{config.strategy_name}]: "
+            f"${books[config.strategy_name]['funds']:.2f}"
+        )
+    return books
+
+
+def scan_symbol(ib, sym, configs, books, scan_state, data_plane=None, stop_books=None):
+    """
+    Fans one symbol out to every strategy that doesn't already hold it.
+    Connection errors put the symbol back at the front of the queue.
+    """
+    try:
+        for config in configs:
+            book = books[config.strategy_name]
+            if sym in book["positions"]:
+                continue
+
+            book["funds"] = _process_buy_candidate(
+                ib,
+                sym,
+                config,
+                book["funds"],
+                data_plane,
+                (stop_books or {}).get(config.strategy_name),
+            )
+    except Exception as e:
+        logging.error(f"‼️ Error processing {sym}: {e}")
+        if _is_connection_error(e):
+            scan_state["remaining_symbols"].insert(0, sym)
+            raise e
+
+
+def run_multi_strategy_buy_scan(
+    ib, configs, scan_state, chunk_size=20, data_plane=None, stop_books=None
+):
+    """
+    Scans one chunk of the universe for every hosted strategy. Each symbol is
+    visited once and fanned out to all strategies, which keep their own funds
+    and position books.
+    """
+    if not scan_state["remaining_symbols"]:
+        return
+
+    chunk = next_scan_chunk(scan_state, chunk_size, configs[0])
+    if not chunk:
+        return
+
+    books = open_scan_books(ib, configs)
+
+    if data_plane is None:
+        for sym in chunk:
+            try:
+                scan_symbol(ib, sym, configs, books, scan_state, data_plane, stop_books)
+            finally:
+
+                ib.sleep(2)
+        return
+
+    prefetch_scan_chunk(ib, configs, chunk, books, scan_state, data_plane)
     for sym in chunk:
-        if sym in current_positions:
-            continue
+        scan_symbol(ib, sym, configs, books, scan_state, data_plane, stop_books)
+
+
+def symbols_to_fetch(configs, chunk, books):
+    """Chunk symbols that at least one strategy doesn't already hold."""
+    return [
+        sym
+        for sym in chunk
+        if any(sym not in books[config.strategy_name]["positions"] for config in configs)
+    ]
 
+
+def prefetch_scan_chunk(ib, configs, chunk, books, scan_state, data_plane):
+    """
+    Downloads the chunk's bars up front, paced like the per-symbol scan, then
+    computes indicators for the whole chunk in one vectorized batch.
+    """
+    symbols = symbols_to_fetch(configs, chunk, books)
+    for i, sym in enumerate(symbols):
         try:
-            available_funds = _process_buy_candidate(ib, sym, config, available_funds)
+            for config in configs:
+                data_plane.get_bars(ib, config, sym)
         except Exception as e:
-            print(f"‼️ Error processing {sym}: {e}")
-            if (
-                isinstance(e, ConnectionError)
-                or "socket" in str(e).lower()
-                or "disconnect" in str(e).lower()
-            ):
-                scan_state["remaining_symbols"].insert(0, sym)
+            logging.error(f"‼️ Error fetching {sym}: {e}")
+            if _is_connection_error(e):
+                scan_state["remaining_symbols"][:0] = chunk[chunk.index(sym):]
                 raise e
         finally:
-
             ib.sleep(2)
 
+    data_plane.warm_indicators(configs, symbols)
+
 
-def _process_sell_candidate(ib, sym, quantity, config):
+def _process_sell_candidate(ib, sym, quantity, config, data_plane=None, stop_book=None):
     """
     Extracted single-position evaluation for selling.
     """
-    pending_sells = get_pending_shares(ib, sym, "SELL")
+    pending_sells = get_pending_shares(ib, sym, "SELL", config.account)
     shares_to_sell = quantity - pending_sells
 
     if shares_to_sell <= 0:
-        print(
+        logging.info(
             f"Skipping SELL for {sym}: all {quantity} shares are already pending sale."
         )
         return
 
-    signal_data = check_current_signal(ib, sym, config)
+    signal_data = check_current_signal(ib, sym, config, data_plane, held=True)
 
     if signal_data and signal_data["action"] == "SELL":
-        print(f"🚨 EXECUTING SELL: {sym}")
-        execute_market_order(ib, sym, "SELL", shares_to_sell)
+        logging.info(f"🚨 EXECUTING SELL: {sym} [{config.strategy_name}]")
+        if config.stop_mode == "native":
+            cancel_protective_stops(ib, sym, config.account)
+        execute_market_order(ib, sym, "SELL", shares_to_sell, config.account)
+    elif stop_book is not None:
+        stop_book.update_from_signal(ib, sym, signal_data)
 
 
-def monitor_open_positions(ib, config):
-    print("\n--- MONITORING OPEN POSITIONS ---")
-    current_positions = get_current_positions(ib)
+def _resize_signal(config, signal_data):
+    """
+    Scan workers size Target_Shares with the account_capital they were
+    started with, which can be a day stale; re-size against the current one.
+    """
+    if "atr" not in signal_data:
+        return signal_data
+    signal_data = dict(signal_data)
+    signal_data["shares"] = size_position(signal_data["price"], signal_data["atr"], config)
+    return signal_data
+
 
-    if not current_positions:
-        print("No open positions to monitor.")
+def route_buy_signals(ib, configs, messages, stop_books=None):
+    """
+    Order-routing side of a sharded scan: executes BUY signals streamed back
+    by the scan workers against each strategy's own funds and positions.
+    """
+    if not messages:
         return
 
-    for sym, quantity in current_positions.items():
-        print(f"Checking {sym} (Holding {quantity} shares)...")
+    configs_by_name = {config.strategy_name: config for config in configs}
+    books = open_scan_books(ib, configs)
+
+    for message in messages:
+        sym = message["symbol"]
+        config = configs_by_name.get(message["strategy"])
+        if config is None:
+            continue
+
+        book = books[config.strategy_name]
+        if sym in book["positions"] or _has_pending_buy(ib, sym, config):
+            continue
 
         try:
-            _process_sell_candidate(ib, sym, quantity, config)
+            book["funds"] = execute_buy_signal(
+                ib,
+                sym,
+                config,
+                book["funds"],
+                _resize_signal(config, message["signal"]),
+                (stop_books or {}).get(config.strategy_name),
+            )
         except Exception as e:
-            print(f"Error monitoring {sym}: {e}")
+            logging.error(f"‼️ Error routing {sym}: {e}")
+            if _is_connection_error(e):
+                raise e
+
+
+def open_monitor_pass(ib, config, stop_book=None):
+    """
+    Returns the strategy's current holdings after the cheap pass over the
+    cached stops.
+    """
+    logging.info(f"--- MONITORING OPEN POSITIONS [{config.strategy_name}] ---")
+    current_positions = get_current_positions(ib, config.account)
+
+    if stop_book is not None:
+        # Cheap pass over cached stops before spending time on full recomputes
+        stop_book.check_all(ib)
+        stop_book.sync_positions(ib, current_positions)
+
+    if not current_positions:
+        logging.info("No open positions to monitor.")
+    return current_positions
+
+
+def monitor_symbol(ib, sym, quantity, config, data_plane=None, stop_book=None):
+    logging.info(f"Checking {sym} (Holding {quantity} shares)...")
+
+    try:
+        _process_sell_candidate(ib, sym, quantity, config, data_plane, stop_book)
+    except Exception as e:
+        logging.error(f"Error monitoring {sym}: {e}")
+
+
+def monitor_open_positions(ib, config, data_plane=None, stop_book=None):
+    current_positions = open_monitor_pass(ib, config, stop_book)
+
+    for sym, quantity in current_positions.items():
+        try:
+            monitor_symbol(ib, sym, quantity, config, data_plane, stop_book)
         finally:
             ib.sleep(2)
@@ -0,0 +1,213 @@
+import copy
+import logging
+import multiprocessing
+import os
+import queue
+import zlib
+
+from ib_insync import IB
+
+from data_plane import SharedDataPlane
+from execution import ensure_connection
+from quality import get_quality_gate
+from scanner import _is_connection_error
+from strategy import check_current_signal
+from utils import setup_logging, create_error_handler
+
+
+# Symbols per data-plane cycle inside a worker, matching the scanner's chunks
+WORKER_CHUNK_SIZE = 20
+# Tries per symbol when the connection drops mid-fetch (reconnecting in between)
+WORKER_SYMBOL_ATTEMPTS = 3
+
+
+def shard_symbols(symbols, n_shards):
+    """
+    Splits the universe by a stable hash, so a symbol lands in the same shard
+    (and the same cache partition) every day, whatever the rest of the list.
+    """
+    shards = [[] for _ in range(n_shards)]
+    for sym in symbols:
+        shards[zlib.crc32(sym.encode()) % n_shards].append(sym)
+    return shards
+
+
+def _partition(path, shard_id):
+    """bar_archive -> bar_archive.shard0, cooldown.json -> cooldown.shard0.json"""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard_id}{ext}"
+
+
+def worker_configs(configs, shard_id):
+    """
+    Per-worker copies of the strategy configs, with the worker's own IBKR
+    client ID and its own partition of every on-disk cache.
+    """
+    copies = []
+    for config in configs:
+        config = copy.copy(config)
+        config.ib_client_id = config.scan_worker_client_id_base + shard_id
+        config.intraday_store_dir = _partition(config.intraday_store_dir, shard_id)
+        config.bar_archive_dir = _partition(config.bar_archive_dir, shard_id)
+        config.quality_cooldown_file = _partition(config.quality_cooldown_file, shard_id)
+        copies.append(config)
+    return copies
+
+
+def _signal_message(sym, config, signal_data):
+    return {
+        "symbol": sym,
+        "strategy": config.strategy_name,
+        "signal": dict(signal_data),
+    }
+
+
+def _scan_symbol(ib, sym, configs, data_plane):
+    """All strategies' BUY signals for one symbol, sent only once all succeed."""
+    messages = []
+    for config in configs:
+        signal_data = check_current_signal(ib, sym, config, data_plane)
+        if signal_data and signal_data["action"] == "BUY":
+            messages.append(_signal_message(sym, config, signal_data))
+    return messages
+
+
+def _scan_shard(ib, shard_id, symbols, configs, signal_queue):
+    data_plane = SharedDataPlane()
+    symbols = get_quality_gate(configs[0]).filter_symbols(symbols)
+    logging.info(f"Shard {shard_id}: scanning {len(symbols)} symbols.")
+
+    for i, sym in enumerate(symbols):
+        if i % WORKER_CHUNK_SIZE == 0:
+            data_plane.begin_cycle()
+
+        for attempt in range(1, WORKER_SYMBOL_ATTEMPTS + 1):
+            ensure_connection(ib, configs[0])
+            try:
+                for message in _scan_symbol(ib, sym, configs, data_plane):
+                    signal_queue.put(message)
+                break
+            except Exception as e:
+                logging.error(f"‼️ Shard {shard_id}: error processing {sym}: {e}")
+                if not _is_connection_error(e):
+                    break
+                # Reconnect on the next attempt and refetch from scratch
+                if ib.isConnected():
+                    ib.disconnect()
+                data_plane.invalidate([sym])
+                if attempt == WORKER_SYMBOL_ATTEMPTS:
+                    logging.error(f"‼️ Shard {shard_id}: giving up on {sym} after {attempt} attempts.")
+            finally:
+                ib.sleep(2)
+
+    data_plane.begin_cycle()
+    data_plane.log_stats()
+
+
+def run_scan_worker(shard_id, symbols, configs, signal_queue):
+    """
+    Entry point of a scan worker process. Scans its shard once over its own
+    IBKR connection and streams BUY signals back to the order router.
+    """
+    setup_logging(f"scan_shard_{shard_id}.log")
+    configs = worker_configs(configs, shard_id)
+
+    ib = IB()
+    ib.errorEvent += create_error_handler("bad_symbols.txt")
+    try:
+        _scan_shard(ib, shard_id, symbols, configs, signal_queue)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ib.isConnected():
+            ib.disconnect()
+        signal_queue.put({"shard": shard_id, "done": True})
+
+
+class ShardedScan:
+    """
+    Coordinator for a sharded universe scan. The order-routing process keeps
+    its connection, funds and positions; dispatch() hands the day's symbols
+    to config.scan_workers worker processes and drain() collects the BUY
+    signals they stream back.
+    """
+
+    def __init__(self, configs):
+        self.configs = list(configs)
+        self.workers = self.configs[0].scan_workers
+        self._context = multiprocessing.get_context("spawn")
+        self._queue = self._context.Queue()
+        self._processes = []
+        self._date = None
+
+    @property
+    def running(self):
+        return any(process.is_alive() for process in self._processes)
+
+    def dispatch(self, scan_state):
+        """
+        Starts one worker per shard when none are running. A finished pass
+        empties remaining_symbols so the daily reset starts the next one;
+        a new scan day restarts the workers on the fresh symbol list.
+        """
+        if self._processes and scan_state["date"] != self._date:
+            logging.info("‼️ NEW DAY DETECTED: Restarting scan workers...")
+            self.stop()
+            stale = self.drain()
+            if stale:
+                logging.info(f"Discarded {len(stale)} signals from the previous scan day.")
+
+        if self.running:
+            return
+
+        if self._processes:
+            for shard_id, process in enumerate(self._processes):
+                if process.exitcode:
+                    logging.error(f"‼️ Scan shard {shard_id} exited with code {process.exitcode}")
+            self._processes = []
+            scan_state["remaining_symbols"] = []
+            return
+
+        if not scan_state["remaining_symbols"]:
+            return
+
+        shards = shard_symbols(scan_state["remaining_symbols"], self.workers)
+        self._date = scan_state["date"]
+        logging.info(
+            f"--- SHARDED SCAN: {len(scan_state['remaining_symbols'])} symbols across "
+            f"{self.workers} workers ({', '.join(str(len(s)) for s in shards)}) ---"
+        )
+
+        for shard_id, shard in enumerate(shards):
+            process = self._context.Process(
+                target=run_scan_worker,
+                args=(shard_id, shard, self.configs, self._queue),
+                name=f"scan-shard-{shard_id}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    def drain(self):
+        """Returns every signal message received since the last drain."""
+        messages = []
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                return messages
+
+            if message.get("done"):
+                logging.info(f"Scan shard {message['shard']} finished its pass.")
+            else:
+                messages.append(message)
+
+    def stop(self):
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            process.join(timeout=5)
+        self._processes = []
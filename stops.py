@@ -0,0 +1,117 @@
+import logging
+import math
+
+from execution import (
+    execute_stop_exit,
+    get_current_positions,
+    get_pending_shares,
+    subscribe_price_stream,
+)
+
+
+def _ticker_price(ticker):
+    price = ticker.marketPrice()
+    if price is None or math.isnan(price) or price <= 0:
+        return None
+    return price
+
+
+class StopBook:
+    """
+    Per-strategy cache of each position's trailing stop level
+    (rolling high - ATR x atr_stop_multiplier).
+
+    Levels are seeded from the full indicator recompute at entry and on
+    every monitor pass, then ratcheted up on each streaming tick. A tick
+    below the cached level sends a market exit straight from the ticker
+    callback, with no history fetch or rescan in between.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._entries = {}
+
+    def __contains__(self, symbol):
+        return symbol in self._entries
+
+    def stop_level(self, symbol):
+        entry = self._entries.get(symbol)
+        return entry["stop"] if entry else None
+
+    def update_from_signal(self, ib, symbol, signal_data):
+        """
+        Re-anchors the cached level to the latest recomputed Trailing_Stop,
+        subscribing to the price stream the first time a symbol is seen.
+        """
+        stop = signal_data.get("stop") if signal_data else None
+        atr = signal_data.get("atr") if signal_data else None
+        if stop is None or atr is None or math.isnan(stop) or math.isnan(atr):
+            return
+
+        stop_distance = atr * self.config.atr_stop_multiplier
+        entry = self._entries.get(symbol)
+
+        if entry is None:
+            contract, ticker = subscribe_price_stream(ib, symbol)
+
+            def on_update(t, ib=ib, symbol=symbol):
+                self._on_tick(ib, symbol, t)
+
+            # reqMktData hands back the same Ticker on re-arm, so the handler
+            # is kept to be detached when the stop is dropped
+            ticker.updateEvent += on_update
+            entry = {"contract": contract, "ticker": ticker, "handler": on_update}
+            self._entries[symbol] = entry
+            logging.info(f"Armed trailing stop for {symbol} at ${stop:.4f}")
+
+        entry["stop_distance"] = stop_distance
+        entry["rolling_high"] = stop + stop_distance
+        entry["stop"] = stop
+
+    def check_all(self, ib):
+        """Sweeps every cached stop against the last streamed price."""
+        for symbol, entry in list(self._entries.items()):
+            self._on_tick(ib, symbol, entry["ticker"])
+
+    def sync_positions(self, ib, current_positions):
+        """
+        Drops stops for symbols that are no longer held and have no entry
+        order still working, and releases their market-data lines.
+        """
+        for symbol in list(self._entries):
+            if symbol in current_positions:
+                continue
+            if get_pending_shares(ib, symbol, "BUY", self.config.account) > 0:
+                continue
+
+            entry = self._entries.pop(symbol)
+            entry["ticker"].updateEvent -= entry["handler"]
+            ib.cancelMktData(entry["contract"])
+
+    def _on_tick(self, ib, symbol, ticker):
+        entry = self._entries.get(symbol)
+        price = _ticker_price(ticker)
+        if entry is None or price is None:
+            return
+
+        if price > entry["rolling_high"]:
+            entry["rolling_high"] = price
+            entry["stop"] = max(entry["stop"], price - entry["stop_distance"])
+            return
+
+        if price >= entry["stop"]:
+            return
+
+        # An exit already working shows up as pending SELL shares, which keeps
+        # a burst of ticks below the stop from sending duplicate orders.
+        held = get_current_positions(ib, self.config.account).get(symbol, 0)
+        quantity = held - get_pending_shares(ib, symbol, "SELL", self.config.account)
+        if quantity <= 0:
+            return
+
+        try:
+            execute_stop_exit(
+                ib, entry["contract"], quantity, entry["stop"], price, self.config.account
+            )
+        except Exception as e:
+            logging.error(f"‼️ Failed to send stop exit for {symbol}: {e}")
@@ -1,6 +1,8 @@
 import numpy as np
 from data import fetch_historical_data
 from indicators import calculate_indicators
+from quality import get_quality_gate
+from strategy_numpy import apply_strategy_filters_numpy, _dynamic_position_arrays
 
 
 def get_latest_live_signal(df, symbol, config):
@@ -18,6 +20,11 @@ def get_latest_live_signal(df, symbol, config):
         "price": latest_data["close"],
     }
 
+    # Lets the exit fast path cache today's stop level without a rescan
+    if "Trailing_Stop" in latest_data:
+        result_signal["stop"] = latest_data["Trailing_Stop"]
+        result_signal["atr"] = latest_data["ATR"]
+
     # This prevents the bot from trapping a position if restarted after the crossover day.
     if crossover == 1.0:
         result_signal["action"] = "BUY"
@@ -28,23 +35,54 @@ def get_latest_live_signal(df, symbol, config):
     return result_signal
 
 
-def check_current_signal(ib, symbol, config):
+def check_current_signal(ib, symbol, config, data_plane=None, held=False):
+    """
+    When a shared data plane is supplied, bars and indicators come from its
+    cache so several strategies can evaluate the same symbol off one fetch.
+    Pass held=True for open positions so the quality gate never hides an exit.
+    """
+    if data_plane is not None:
+        df = data_plane.get_indicators(ib, config, symbol, held=held)
+        return evaluate_signal(df, symbol, config)
+
     df = fetch_historical_data(ib, config, symbol=symbol)
+    df = get_quality_gate(config).check(symbol, df, config, held=held)
 
     if df is not None and not df.empty:
         df = calculate_indicators(df, config)
-        df = generate_base_trend(df)
-        df = apply_volume_filter(df)
-        df = apply_adx_filter(df, threshold=config.adx_threshold)
-        df = apply_trailing_stop_loss(df, config)
-        df = apply_52w_high_filter(df)
-        df = generate_signals_from_trend(df)
-        df = calculate_dynamic_position(df, config)
-
-        return get_latest_live_signal(df, symbol, config)
+        return evaluate_signal(df, symbol, config)
     return None
 
 
+def evaluate_signal(df, symbol, config):
+    """
+    Runs the strategy filter chain on a frame that already carries indicators.
+    """
+    if df is None or df.empty:
+        return None
+
+    df = apply_strategy_filters(df, config)
+    return get_latest_live_signal(df, symbol, config)
+
+
+def apply_strategy_filters(df, config):
+    """
+    Produces Trend, Crossover_Signal and Target_Shares with the engine
+    selected by config.strategy_engine. Both engines give identical output.
+    """
+    if config.strategy_engine == "numpy":
+        return apply_strategy_filters_numpy(df, config)
+
+    df = generate_base_trend(df)
+    df = apply_volume_filter(df)
+    df = apply_adx_filter(df, threshold=config.adx_threshold)
+    df = apply_trailing_stop_loss(df, config)
+    df = apply_52w_high_filter(df)
+    df = generate_signals_from_trend(df)
+    df = calculate_dynamic_position(df, config)
+    return df
+
+
 def generate_base_trend(df):
     if df is None or df.empty:
         return df
@@ -110,6 +148,19 @@ def generate_signals_from_trend(df):
     return df
 
 
+def size_position(price, atr, config):
+    """
+    Target_Shares for a single signal at the current config.account_capital,
+    the scalar form of calculate_dynamic_position.
+    """
+    sizing = _dynamic_position_arrays(
+        np.array([price], dtype=float),
+        np.array([atr * config.atr_stop_multiplier], dtype=float),
+        config,
+    )
+    return float(sizing["Target_Shares"][0])
+
+
 def calculate_dynamic_position(df, config):
     if df is None or df.empty or "ATR" not in df.columns:
         return df
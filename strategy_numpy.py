@@ -0,0 +1,105 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _column(df, name):
+    return df[name].to_numpy(dtype=np.float64)
+
+
+def _shift(values, periods=1):
+    shifted = np.empty_like(values)
+    shifted[:periods] = np.nan
+    shifted[periods:] = values[:-periods]
+    return shifted
+
+
+def _rolling_max(values, window):
+    """
+    Equivalent of Series.rolling(window, min_periods=1).max(): NaNs are
+    skipped and an all-NaN window yields NaN.
+    """
+    padded = np.concatenate([np.full(window - 1, np.nan), values])
+    windows = sliding_window_view(padded, window)
+
+    with np.errstate(invalid="ignore"):
+        valid = ~np.isnan(windows)
+        maxima = np.where(valid, windows, -np.inf).max(axis=1)
+
+    return np.where(valid.any(axis=1), maxima, np.nan)
+
+
+def apply_strategy_filters_numpy(df, config):
+    """
+    Single-pass replacement for the pandas filter chain in strategy.py.
+    Every filter is reduced to one boolean mask over contiguous arrays and
+    the outputs are attached in one assign(), so the shared frame is never
+    mutated through .loc. Produces the same columns and values as the
+    pandas path.
+    """
+    if df is None or df.empty:
+        return df
+
+    columns = df.columns
+    close = _column(df, "close")
+    ema_fast = _column(df, "EMA_Fast")
+    sma_slow = _column(df, "SMA_Slow")
+
+    # NaN comparisons are False, matching the pandas masks
+    with np.errstate(invalid="ignore"):
+        trend_up = ema_fast > sma_slow
+        blocked = np.zeros(len(close), dtype=bool)
+
+        if "Volume_SMA" in columns:
+            low_volume = _column(df, "volume") <= _column(df, "Volume_SMA")
+            low_volume[-1] = False
+            blocked |= low_volume
+
+        if "ADX" in columns:
+            blocked |= _column(df, "ADX") < config.adx_threshold
+
+        outputs = {}
+        if "ATR" in columns:
+            atr_stop_distance = _column(df, "ATR") * config.atr_stop_multiplier
+            trailing_stop = _rolling_max(close, config.ema_fast) - atr_stop_distance
+            blocked |= close < trailing_stop
+            outputs["Trailing_Stop"] = trailing_stop
+
+        if "high" in columns:
+            rolling_52w_high = _rolling_max(_shift(_column(df, "high")), 252)
+            was_downtrend = _shift(ema_fast) <= _shift(sma_slow)
+            blocked |= (close >= rolling_52w_high) & was_downtrend
+
+    trend = np.where(trend_up & ~blocked, 1, 0)
+
+    crossover = np.empty(len(trend), dtype=np.float64)
+    crossover[0] = np.nan
+    crossover[1:] = np.diff(trend)
+
+    outputs = {"Trend": trend, **outputs, "Crossover_Signal": crossover}
+
+    if "ATR" in columns:
+        outputs.update(_dynamic_position_arrays(close, atr_stop_distance, config))
+
+    return df.assign(**outputs)
+
+
+def _dynamic_position_arrays(close, stop_distance, config):
+    """
+    Array form of strategy.calculate_dynamic_position.
+    """
+    dollar_risk = config.account_capital * config.risk_per_trade_pct
+
+    safe_stop_distance = np.where(stop_distance == 0, 1e-9, stop_distance)
+    risk_shares = np.floor(dollar_risk / safe_stop_distance)
+
+    max_position_value_by_pct = config.account_capital * config.max_position_pct
+    actual_max_position_value = min(max_position_value_by_pct, config.max_position_usd)
+
+    max_capital_shares = np.floor(actual_max_position_value / close)
+
+    target_shares = np.maximum(np.minimum(risk_shares, max_capital_shares), 1)
+
+    target_weight = (target_shares * close) / config.account_capital
+    target_weight = np.minimum(target_weight, 1.0)
+
+    return {"Target_Shares": target_shares, "Target_Weight": target_weight}
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The bot is a flat set of top-level modules, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_daily_bars(n_bars=300, seed=0):
+    """Random-walk OHLCV in the util.df(bars) layout."""
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n_bars)))
+    return pd.DataFrame(
+        {
+            "date": [d.date() for d in pd.bdate_range("2023-01-02", periods=n_bars)],
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": rng.integers(1_000, 50_000, n_bars).astype(float),
+        }
+    )
+
+
+@pytest.fixture
+def daily_bars():
+    return make_daily_bars
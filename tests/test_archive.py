@@ -0,0 +1,83 @@
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from archive import BarArchive, duration_start
+from data import _archive_request_duration
+
+
+def _split(df, ratio=2.0):
+    df = df.copy()
+    for column in ("open", "high", "low", "close"):
+        df[column] = df[column] / ratio
+    return df
+
+
+def test_appends_only_newer_bars(tmp_path, daily_bars):
+    df = daily_bars(n_bars=50)
+    archive = BarArchive(str(tmp_path))
+    archive.stage("X", df.iloc[:40])
+    archive.flush()
+
+    archive.stage("X", df.iloc[35:])
+    archive.flush()
+
+    np.testing.assert_array_equal(archive.read_frame("X")["close"], df["close"])
+    assert not archive.differs("X", df.iloc[35:])
+
+
+def test_restated_history_is_replaced(tmp_path, daily_bars):
+    df = daily_bars(n_bars=50)
+    archive = BarArchive(str(tmp_path))
+    archive.stage("X", df.iloc[:40])
+    archive.stage("Y", df)
+    archive.flush()
+
+    adjusted = _split(df)
+    assert archive.differs("X", adjusted.iloc[39:])
+
+    archive.replace("X", adjusted)
+    np.testing.assert_array_equal(archive.read_frame("X")["close"], adjusted["close"])
+    archive.flush()
+
+    reopened = BarArchive(str(tmp_path))
+    np.testing.assert_array_equal(reopened.read_frame("X")["close"], adjusted["close"])
+    np.testing.assert_array_equal(reopened.read_frame("Y")["close"], df["close"])
+    assert len(reopened._extents["X"]) == 1
+
+
+def test_read_frame_dates_are_datetime64(tmp_path, daily_bars):
+    df = daily_bars(n_bars=20)
+    archive = BarArchive(str(tmp_path))
+    archive.stage("X", df)
+
+    frame = archive.read_frame("X", start=datetime.date(2023, 1, 10))
+    assert pd.api.types.is_datetime64_any_dtype(frame["date"])
+    assert frame["date"].iloc[0] == pd.Timestamp("2023-01-10")
+
+
+def test_longer_lookback_refetches_the_full_history(tmp_path, daily_bars):
+    df = daily_bars(n_bars=300)
+    today = df["date"].iloc[-1] + datetime.timedelta(days=1)
+    archive = BarArchive(str(tmp_path))
+    archive.replace("X", df.iloc[-120:], covered_from=df["date"].iloc[-120])
+
+    short = SimpleNamespace(lookback_duration="3 M")
+    assert _archive_request_duration(short, archive, "X", today) == ("2 D", False)
+
+    longer = SimpleNamespace(lookback_duration="1 Y")
+    assert _archive_request_duration(longer, archive, "X", today) == ("1 Y", True)
+
+
+def test_recent_listing_is_not_refetched_once_covered(tmp_path, daily_bars):
+    df = daily_bars(n_bars=30)
+    today = df["date"].iloc[-1] + datetime.timedelta(days=1)
+    config = SimpleNamespace(lookback_duration="1 Y")
+    archive = BarArchive(str(tmp_path))
+    archive.replace("X", df, covered_from=duration_start(today, config.lookback_duration))
+    archive.flush()
+
+    reopened = BarArchive(str(tmp_path))
+    assert _archive_request_duration(config, reopened, "X", today) == ("2 D", False)
@@ -0,0 +1,43 @@
+import asyncio
+import datetime
+import threading
+from types import SimpleNamespace
+
+import clock
+from async_loop import TradingSession, session_clock_task
+from clock import EASTERN, SimulatedClock
+
+
+def test_daily_symbol_load_runs_off_the_event_loop():
+    start = datetime.datetime(2024, 6, 3, 10, 0, tzinfo=EASTERN)
+    clock.set_clock(SimulatedClock(start, start + datetime.timedelta(hours=1)))
+    released = threading.Event()
+
+    def load_symbols():
+        # Only the event loop can release it, so this deadlocks if run on the loop
+        assert released.wait(timeout=5)
+        return ["A", "B"]
+
+    async def main():
+        session = TradingSession(
+            SimpleNamespace(isConnected=lambda: False),
+            SimpleNamespace(refresh_account_capital=lambda ib: None),
+            {"date": None, "all_symbols": [], "remaining_symbols": []},
+            load_symbols=load_symbols,
+        )
+        session.connected.set()
+        task = asyncio.create_task(session_clock_task(session))
+        await asyncio.sleep(0.05)
+        released.set()
+        try:
+            await asyncio.wait_for(session.trading.wait(), timeout=5)
+        finally:
+            task.cancel()
+        return session.scan_state
+
+    try:
+        scan_state = asyncio.run(main())
+    finally:
+        clock.set_clock(clock.SystemClock())
+
+    assert scan_state["remaining_symbols"] == ["A", "B"]
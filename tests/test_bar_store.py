@@ -0,0 +1,110 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import EXCHANGE_TZ, MinuteBarStore, _duration_since, resample_bars
+
+
+def make_minute_bars(sessions, seed=0):
+    """RTH 1-minute bars for the given session dates, timestamped in UTC like formatDate=2."""
+    rng = np.random.default_rng(seed)
+    times = []
+    for day in sessions:
+        opening = pd.Timestamp(f"{day} 09:30", tz=EXCHANGE_TZ)
+        times.extend(opening + pd.to_timedelta(np.arange(390), unit="min"))
+    n = len(times)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, n))
+    open_ = close + rng.normal(0, 0.02, n)
+    return pd.DataFrame(
+        {
+            "date": pd.DatetimeIndex(times).tz_convert("UTC"),
+            "open": open_,
+            "high": np.maximum(open_, close) + 0.01,
+            "low": np.minimum(open_, close) - 0.01,
+            "close": close,
+            "volume": rng.integers(100, 1_000, n).astype(float),
+            "average": close,
+            "barCount": np.ones(n),
+        }
+    )
+
+
+def test_daily_bins_split_on_the_new_york_session():
+    # Winter and summer sessions: the close is 21:00 UTC in one, 20:00 UTC in the other
+    minutes = make_minute_bars(["2024-03-08", "2024-03-11"])
+    daily = resample_bars(minutes, "1 day")
+
+    assert list(daily["date"]) == [datetime.date(2024, 3, 8), datetime.date(2024, 3, 11)]
+    for day, session in zip(daily.itertuples(), (minutes.iloc[:390], minutes.iloc[390:])):
+        assert day.open == session["open"].iloc[0]
+        assert day.close == session["close"].iloc[-1]
+        assert day.high == session["high"].max()
+        assert day.low == session["low"].min()
+        assert day.volume == session["volume"].sum()
+
+
+def test_intraday_bins_line_up_with_the_open():
+    minutes = make_minute_bars(["2024-03-11"])
+    bars = resample_bars(minutes, "15 mins")
+
+    assert len(bars) == 26
+    assert bars["date"].iloc[0] == pd.Timestamp("2024-03-11 09:30", tz=EXCHANGE_TZ)
+    assert bars["volume"].sum() == minutes["volume"].sum()
+    # VWAP is re-weighted by volume, not averaged
+    first = minutes.iloc[:15]
+    expected = (first["average"] * first["volume"]).sum() / first["volume"].sum()
+    assert bars["average"].iloc[0] == pytest.approx(expected)
+
+
+def test_merge_replaces_the_partial_minute_and_trims_retention():
+    minutes = make_minute_bars(["2024-03-01", "2024-03-11"])
+    store = MinuteBarStore(retention_days=5)
+
+    store.merge("X", minutes.iloc[:400])
+    revised = minutes.iloc[399:].copy()
+    revised.loc[399, "close"] += 1.0
+    merged = store.merge("X", revised)
+
+    # The 2024-03-01 session is older than the retention window
+    assert merged["date"].iloc[0] == minutes["date"].iloc[390]
+    assert merged["date"].is_unique and merged["date"].is_monotonic_increasing
+    assert merged.loc[merged["date"] == minutes["date"].iloc[399], "close"].item() == revised.loc[399, "close"]
+    assert len(merged) == 390
+
+
+def test_evicted_symbols_are_no_longer_fresh():
+    minutes = make_minute_bars(["2024-03-11"])
+    store = MinuteBarStore(max_symbols=2)
+    for sym in ("A", "B", "C"):
+        store.merge(sym, minutes)
+
+    assert store.get("A") is None
+    assert not store.is_fresh("A")
+    assert store.request_params("A", "5 D")["durationStr"] == "5 D"
+    assert store.is_fresh("C")
+
+
+def test_evicted_symbols_reload_from_the_cache_dir(tmp_path):
+    minutes = make_minute_bars(["2024-03-11"])
+    store = MinuteBarStore(cache_dir=str(tmp_path), max_symbols=1)
+    store.merge("A", minutes)
+    store.merge("B", minutes)
+
+    pd.testing.assert_frame_equal(store.get("A"), store.merge("A", None))
+    assert list(store._bars) == ["A"]
+
+
+@pytest.mark.parametrize(
+    "age, expected",
+    [
+        (None, "5 D"),
+        (pd.Timedelta(seconds=30), "90 S"),
+        (pd.Timedelta(hours=30), "2 D"),
+        (pd.Timedelta(days=20), "5 D"),
+    ],
+)
+def test_duration_since_last_bar(age, expected):
+    last = None if age is None else pd.Timestamp.now(tz=EXCHANGE_TZ) - age
+    assert _duration_since(last, "5 D", retention_days=10) == expected
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from config import StrategyConfig
+from indicators import calculate_indicators, calculate_indicators_batch
+from kernels import NUMBA_AVAILABLE, compute_atr_adx
+
+BACKENDS = ["numpy"] + (["numba"] if NUMBA_AVAILABLE else [])
+
+
+def _reference(df, window=14):
+    ref = indicators.add_adx_indicator(df.copy(), window)
+    ref = indicators.add_atr_indicator(ref, window)
+    return ref["ATR"].to_numpy(), ref["ADX"].to_numpy()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("seed", range(10))
+def test_kernel_matches_pandas_reference(daily_bars, backend, seed):
+    df = daily_bars(seed=seed)
+    expected_atr, expected_adx = _reference(df)
+
+    atr, adx = compute_atr_adx(df["high"], df["low"], df["close"], 14, backend)
+
+    np.testing.assert_allclose(atr, expected_atr, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(adx, expected_adx, rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_kernel_carries_average_across_nan_gaps(daily_bars, backend):
+    df = daily_bars(seed=3)
+    df.loc[[40, 41, 120], ["high", "low", "close"]] = np.nan
+    expected_atr, expected_adx = _reference(df)
+
+    atr, adx = compute_atr_adx(df["high"], df["low"], df["close"], 14, backend)
+
+    np.testing.assert_allclose(atr, expected_atr, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(adx, expected_adx, rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("backend", ["pandas", "numpy"])
+def test_batch_matches_single_symbol_path(daily_bars, backend):
+    config = StrategyConfig(indicator_backend=backend)
+    frames = {f"S{i}": daily_bars(n_bars=200 + 25 * i, seed=i) for i in range(5)}
+
+    batch = calculate_indicators_batch({s: df.copy() for s, df in frames.items()}, config)
+
+    for symbol, df in frames.items():
+        expected = calculate_indicators(df.copy(), StrategyConfig(indicator_backend="pandas"))
+        pd.testing.assert_frame_equal(
+            batch[symbol][expected.columns], expected, check_exact=False, rtol=1e-12
+        )
+
+
+def test_numba_backend_falls_back_without_numba(daily_bars, monkeypatch):
+    monkeypatch.setattr(indicators, "NUMBA_AVAILABLE", False)
+    df = daily_bars(seed=1)
+
+    out = calculate_indicators(df.copy(), StrategyConfig(indicator_backend="numba"))
+    expected = calculate_indicators(df.copy(), StrategyConfig(indicator_backend="pandas"))
+
+    np.testing.assert_allclose(out["ATR"], expected["ATR"], rtol=1e-12, equal_nan=True)
+
+
+def test_batch_honours_the_pandas_backend(daily_bars, monkeypatch):
+    def kernel_called(*args, **kwargs):
+        raise AssertionError("pandas backend must not use the fused kernel")
+
+    monkeypatch.setattr(indicators, "compute_atr_adx", kernel_called)
+    frames = {f"S{i}": daily_bars(seed=i) for i in range(3)}
+
+    batch = calculate_indicators_batch(frames, StrategyConfig(indicator_backend="pandas"))
+    assert all("ATR" in df.columns for df in batch.values())
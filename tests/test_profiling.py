@@ -0,0 +1,59 @@
+import os
+import time
+
+from profiling import ScanProfiler
+
+
+def _busy(seconds=0.02):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sections_are_recorded_apart(tmp_path):
+    profiler = ScanProfiler(mode="cprofile", output_dir=str(tmp_path))
+    profiler.arm(2)
+
+    for _ in range(2):
+        with profiler.cycle():
+            with profiler.section("monitor"):
+                _busy()
+            with profiler.section("scan"):
+                _busy()
+
+    assert not profiler.active
+    names = sorted(name.split(".")[1] for name in os.listdir(tmp_path))
+    assert names == ["monitor", "scan"]
+
+
+def test_sampled_stacks_are_rooted_at_their_section(tmp_path):
+    profiler = ScanProfiler(mode="sampling", output_dir=str(tmp_path), sample_interval=0.001)
+    profiler.arm(1)
+
+    with profiler.cycle():
+        with profiler.section("scan"):
+            _busy()
+            with profiler.section("monitor"):
+                _busy()
+
+    (path,) = os.listdir(tmp_path)
+    with open(os.path.join(tmp_path, path)) as f:
+        roots = {line.split(";", 1)[0] for line in f}
+    assert roots == {"monitor", "scan"}
+
+
+def test_overlapping_cycles_finish_after_the_last_one(tmp_path):
+    profiler = ScanProfiler(mode="cprofile", output_dir=str(tmp_path))
+    profiler.arm(1)
+
+    with profiler.cycle():
+        # A second task's cycle while the only counted one is still open
+        with profiler.cycle():
+            with profiler.section("monitor"):
+                _busy()
+        assert profiler.active
+        with profiler.section("scan"):
+            _busy()
+
+    assert not profiler.active
+    assert len(os.listdir(tmp_path)) == 2
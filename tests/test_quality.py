@@ -0,0 +1,36 @@
+from config import StrategyConfig
+from quality import DataQualityGate, validate_bars
+
+
+def _gap(df, at, ratio):
+    """Scales every bar from `at` on, as an unadjusted split or a crash would."""
+    df = df.copy()
+    for column in ("open", "high", "low", "close"):
+        df.loc[at:, column] = df.loc[at:, column] / ratio
+    df.loc[at, "open"] = df.loc[at - 1, "close"] / ratio
+    return df
+
+
+def test_recent_split_ratio_is_rejected(daily_bars):
+    df = _gap(daily_bars(), at=298, ratio=2.0)
+    _, reason = validate_bars(df, StrategyConfig())
+    assert reason == "split_jump"
+
+
+def test_crash_and_old_split_are_not_splits(daily_bars):
+    config = StrategyConfig()
+    crash = _gap(daily_bars(), at=298, ratio=1.8)
+    old_split = _gap(daily_bars(), at=100, ratio=2.0)
+
+    assert validate_bars(crash, config)[1] is None
+    assert validate_bars(old_split, config)[1] is None
+
+
+def test_held_symbol_is_never_rejected(daily_bars):
+    config = StrategyConfig(quality_cooldown_file=None)
+    gate = DataQualityGate(path=None)
+    df = _gap(daily_bars(), at=298, ratio=2.0)
+
+    assert gate.check("X", df, config) is None
+    assert len(gate.check("X", df, config, held=True)) == len(df)
+    assert gate.check("X", None, config, held=True) is None
@@ -0,0 +1,74 @@
+import asyncio
+import datetime
+
+import pytest
+
+import clock
+from clock import EASTERN, SimulatedClock
+from config import StrategyConfig
+from replay import ReplayBarSource, ReplayIB, SimulatedEventLoop, run_replay
+from runner import StrategyRunner
+
+
+def test_event_loop_sleeps_on_the_simulated_clock(tmp_path):
+    start = datetime.datetime(2024, 6, 3, 9, 30, tzinfo=EASTERN)
+    clock = SimulatedClock(start=start, end=start + datetime.timedelta(days=1))
+    ib = ReplayIB(clock, ReplayBarSource(str(tmp_path)))
+    woke = []
+
+    async def task(name, seconds):
+        await asyncio.sleep(seconds)
+        woke.append((name, clock.now() - start))
+
+    async def main():
+        await asyncio.gather(task("scan", 5), task("monitor", 30))
+
+    loop = SimulatedEventLoop(ib)
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+    assert woke == [
+        ("scan", datetime.timedelta(seconds=5)),
+        ("monitor", datetime.timedelta(seconds=30)),
+    ]
+
+
+def test_replay_scans_in_process_even_with_workers_configured(tmp_path, daily_bars):
+    daily_bars().to_pickle(tmp_path / "X.pkl")
+    runner = StrategyRunner([StrategyConfig(scan_workers=2, quality_cooldown_file=None)])
+    seen = []
+
+    def main_loop(ib, runner, scan_state, load_symbols, should_continue):
+        seen.append(runner.sharded_scan)
+
+    try:
+        day = datetime.date(2023, 6, 1)
+        run_replay(runner, day, day, cache_dir=str(tmp_path), main_loop=main_loop)
+    finally:
+        clock.set_clock(clock.SystemClock())
+
+    assert seen == [None]
+
+
+@pytest.mark.parametrize(
+    "lookback, duration",
+    [("6 M", "1 Y"), ("1 Y", "2 Y"), ("2 Y", "3 Y")],
+)
+def test_populate_requests_the_window_plus_lookback(tmp_path, lookback, duration):
+    class RecordingIB:
+        def __init__(self):
+            self.durations = []
+
+        def reqHistoricalData(self, contract, durationStr, **kwargs):
+            self.durations.append(durationStr)
+            return []
+
+        def sleep(self, seconds):
+            pass
+
+    ib = RecordingIB()
+    bars = ReplayBarSource(str(tmp_path))
+    bars.populate(ib, ["X"], datetime.date(2024, 1, 2), datetime.date(2024, 3, 29), lookback)
+    assert ib.durations == [duration]
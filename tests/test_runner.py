@@ -0,0 +1,39 @@
+import asyncio
+import datetime
+
+import runner as runner_module
+from clock import EASTERN, SimulatedClock
+from config import StrategyConfig
+from replay import ReplayBarSource, ReplayIB
+from runner import StrategyRunner
+
+
+def _replay_ib(tmp_path, daily_bars, symbols):
+    for sym in symbols:
+        daily_bars().to_pickle(tmp_path / f"{sym}.pkl")
+    start = datetime.datetime(2023, 6, 1, 15, 50, tzinfo=EASTERN)
+    clock = SimulatedClock(start, start + datetime.timedelta(hours=1))
+    ib = ReplayIB(clock, ReplayBarSource(str(tmp_path)))
+    ib.connect()
+    return ib
+
+
+def test_scan_chunk_places_nothing_once_the_gate_closes(tmp_path, daily_bars, monkeypatch):
+    symbols = ["A", "B", "C"]
+    ib = _replay_ib(tmp_path, daily_bars, symbols)
+    runner = StrategyRunner([StrategyConfig(quality_cooldown_file=None)])
+    scan_state = {"date": None, "all_symbols": symbols, "remaining_symbols": list(symbols)}
+
+    evaluated = []
+    monkeypatch.setattr(runner_module, "scan_symbol", lambda ib, sym, *args: evaluated.append(sym))
+    # Open for every fetch, closed by the time the chunk would be evaluated
+    checks = iter([True] * len(symbols))
+
+    asyncio.run(
+        runner.scan_chunk_async(
+            ib, scan_state, pause=0, keep_going=lambda: next(checks, False)
+        )
+    )
+
+    assert evaluated == []
+    assert scan_state["remaining_symbols"] == symbols
@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+from eventkit import Event
+
+import stops
+from config import StrategyConfig
+from runner import StrategyRunner
+from stops import StopBook
+
+
+class FakeTicker:
+    def __init__(self):
+        self.price = float("nan")
+        self.updateEvent = Event("updateEvent")
+
+    def marketPrice(self):
+        return self.price
+
+    def tick(self, price):
+        self.price = price
+        self.updateEvent.emit(self)
+
+
+class FakeIB:
+    def __init__(self, positions=None):
+        self.held = dict(positions or {})
+        self.trades = []
+        self.cancelled = []
+
+    def positions(self, account=""):
+        return [
+            SimpleNamespace(contract=SimpleNamespace(symbol=sym), position=qty)
+            for sym, qty in self.held.items()
+        ]
+
+    def openTrades(self):
+        return self.trades
+
+    def cancelMktData(self, contract):
+        self.cancelled.append(contract.symbol)
+
+
+def _trade(symbol, action, quantity, account=""):
+    return SimpleNamespace(
+        contract=SimpleNamespace(symbol=symbol),
+        order=SimpleNamespace(action=action, totalQuantity=quantity, account=account, orderRef=""),
+        orderStatus=SimpleNamespace(filled=0.0),
+    )
+
+
+def _armed_book(monkeypatch, ib, symbol="X", stop=95.0, atr=2.5):
+    ticker = FakeTicker()
+    monkeypatch.setattr(
+        stops, "subscribe_price_stream", lambda ib, sym: (SimpleNamespace(symbol=sym), ticker)
+    )
+    exits = []
+
+    def fake_exit(ib, contract, quantity, stop_price, price, account=None):
+        exits.append((contract.symbol, quantity, stop_price, price))
+        ib.trades.append(_trade(contract.symbol, "SELL", quantity))
+
+    monkeypatch.setattr(stops, "execute_stop_exit", fake_exit)
+
+    config = StrategyConfig(quality_cooldown_file=None)
+    book = StopBook(config)
+    book.update_from_signal(ib, symbol, {"stop": stop, "atr": atr})
+    return book, ticker, exits
+
+
+def test_stop_ratchets_up_and_never_down(monkeypatch):
+    ib = FakeIB({"X": 100})
+    book, ticker, exits = _armed_book(monkeypatch, ib)
+    distance = 2.5 * book.config.atr_stop_multiplier
+
+    ticker.tick(120.0)
+    assert book.stop_level("X") == max(95.0, 120.0 - distance)
+    raised = book.stop_level("X")
+
+    ticker.tick(119.0)
+    assert book.stop_level("X") == raised
+    assert exits == []
+
+
+def test_tick_below_stop_exits_held_shares_once(monkeypatch):
+    ib = FakeIB({"X": 100})
+    book, ticker, exits = _armed_book(monkeypatch, ib)
+
+    ticker.tick(94.0)
+    ticker.tick(93.5)
+    book.check_all(ib)
+
+    assert exits == [("X", 100, 95.0, 94.0)]
+
+
+def test_sync_positions_releases_closed_positions(monkeypatch):
+    ib = FakeIB({"X": 100})
+    book, ticker, exits = _armed_book(monkeypatch, ib)
+
+    ib.held.clear()
+    book.sync_positions(ib, {})
+    assert "X" not in book
+    assert ib.cancelled == ["X"]
+
+    # The detached handler no longer reacts to ticks
+    ticker.tick(50.0)
+    assert exits == []
+
+
+def test_buy_fill_keeps_a_freshly_armed_stop(monkeypatch):
+    # execDetails for the entry arrives before IBKR's position update
+    ib = FakeIB()
+    book, ticker, exits = _armed_book(monkeypatch, ib)
+    runner = StrategyRunner([book.config])
+    runner.stop_books = {book.config.strategy_name: book}
+
+    runner.on_fill(ib, _trade("X", "BUY", 100))
+    assert "X" in book
+
+    runner.on_fill(ib, _trade("X", "SELL", 100))
+    assert "X" not in book
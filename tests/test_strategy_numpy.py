@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+from config import StrategyConfig
+from indicators import calculate_indicators
+from strategy import apply_strategy_filters, size_position
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_numpy_engine_matches_pandas_chain(daily_bars, seed):
+    df = calculate_indicators(daily_bars(seed=seed), StrategyConfig(indicator_backend="pandas"))
+
+    expected = apply_strategy_filters(df.copy(), StrategyConfig(strategy_engine="pandas"))
+    actual = apply_strategy_filters(df.copy(), StrategyConfig(strategy_engine="numpy"))
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+def test_numpy_engine_handles_short_history(daily_bars):
+    df = calculate_indicators(daily_bars(n_bars=30), StrategyConfig(indicator_backend="pandas"))
+
+    expected = apply_strategy_filters(df.copy(), StrategyConfig(strategy_engine="pandas"))
+    actual = apply_strategy_filters(df.copy(), StrategyConfig(strategy_engine="numpy"))
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+@pytest.mark.parametrize("capital", [5_000.0, 100_000.0, 2_000_000.0])
+def test_size_position_matches_target_shares(daily_bars, capital):
+    config = StrategyConfig(indicator_backend="pandas", account_capital=capital)
+    df = apply_strategy_filters(calculate_indicators(daily_bars(seed=1), config), config)
+    latest = df.dropna(subset=["ATR"]).iloc[-1]
+
+    assert size_position(latest["close"], latest["ATR"], config) == latest["Target_Shares"]
@@ -0,0 +1,71 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+import utils
+from utils import JsonFormatter, RateLimitFilter, SizeAndTimeRotatingFileHandler
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(
+        utils, "time", SimpleNamespace(monotonic=lambda: now.value, time=lambda: now.value)
+    )
+    return now
+
+
+def _record(msg, level=logging.INFO, **extra):
+    record = logging.LogRecord("bot", level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_repeats_are_suppressed_then_counted(fake_time):
+    rate_limit = RateLimitFilter(interval=10.0)
+
+    assert rate_limit.filter(_record("no data for X"))
+    fake_time.value += 1
+    assert not rate_limit.filter(_record("no data for X"))
+    assert not rate_limit.filter(_record("no data for X"))
+    assert rate_limit.filter(_record("no data for Y"))
+
+    fake_time.value += 10
+    record = _record("no data for X")
+    assert rate_limit.filter(record)
+    assert record.getMessage() == "no data for X (suppressed 2 repeats)"
+
+
+def test_errors_are_never_suppressed(fake_time):
+    rate_limit = RateLimitFilter(interval=10.0)
+    assert all(rate_limit.filter(_record("order rejected", logging.ERROR)) for _ in range(3))
+
+
+def test_json_lines_carry_extra_fields():
+    record = _record("STOP HIT", logging.WARNING, event="stop_exit", symbol="X", price=9.5)
+    payload = json.loads(JsonFormatter().format(record))
+
+    assert payload["msg"] == "STOP HIT"
+    assert payload["level"] == "WARNING"
+    assert (payload["event"], payload["symbol"], payload["price"]) == ("stop_exit", "X", 9.5)
+    assert "lineno" not in payload
+
+
+def test_log_rolls_over_on_size_or_age(tmp_path, fake_time):
+    path = tmp_path / "bot.log"
+    handler = SizeAndTimeRotatingFileHandler(str(path), 200, 3, rotate_seconds=60)
+    try:
+        handler.emit(_record("first"))
+        assert not (tmp_path / "bot.log.1").exists()
+
+        fake_time.value += 61
+        handler.emit(_record("second"))
+        assert (tmp_path / "bot.log.1").read_text().strip() == "first"
+
+        handler.emit(_record("x" * 300))
+        handler.emit(_record("third"))
+        assert (tmp_path / "bot.log.2").exists()
+    finally:
+        handler.close()
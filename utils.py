@@ -1,25 +1,148 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import re
+import time
 
 
-def setup_logging(log_filename="trading_bot.log"):
-    """Configures file and console logging for the bot and ib_insync."""
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
+# LogRecord attributes that are part of every record; anything else on a
+# record came from `extra=` and is emitted as a structured field.
+_STANDARD_RECORD_FIELDS = set(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Renders each record as one JSON object per line, including `extra=` fields."""
+
+    def format(self, record):
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_FIELDS and not key.startswith("_"):
+                payload[key] = value
+
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rolls the log over when it exceeds max_bytes OR when rotate_seconds have
+    elapsed since the last rollover, whichever comes first.
+    """
+
+    def __init__(self, filename, max_bytes, backup_count, rotate_seconds):
+        super().__init__(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        self.rotate_seconds = rotate_seconds
+        self._next_rollover = time.time() + rotate_seconds
+
+    def shouldRollover(self, record):
+        if self.rotate_seconds and time.time() >= self._next_rollover:
+            return True
+        return super().shouldRollover(record)
 
-    formatter = logging.Formatter(
-        "[%(asctime)s] - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    def doRollover(self):
+        super().doRollover()
+        self._next_rollover = time.time() + self.rotate_seconds
 
-    file_handler = logging.FileHandler(log_filename)
-    file_handler.setFormatter(formatter)
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
+class RateLimitFilter(logging.Filter):
+    """
+    Drops identical messages repeated within `interval` seconds, then notes how
+    many were suppressed the next time the message gets through. Runs before
+    the record is queued, so bursts never reach the writer thread.
+    """
+
+    def __init__(self, interval=10.0, max_keys=5000):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._seen = {}
+
+    def filter(self, record):
+        if self.interval <= 0 or record.levelno >= logging.ERROR:
+            return True
+
+        now = time.monotonic()
+        key = (record.name, record.levelno, record.getMessage())
+        last_emit, suppressed = self._seen.get(key, (None, 0))
+
+        if last_emit is not None and now - last_emit < self.interval:
+            self._seen[key] = (last_emit, suppressed + 1)
+            return False
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (suppressed {suppressed} repeats)"
+            record.args = None
+
+        if len(self._seen) >= self.max_keys:
+            self._prune(now)
+        self._seen[key] = (now, 0)
+        return True
+
+    def _prune(self, now):
+        expired = [k for k, (t, _) in self._seen.items() if now - t >= self.interval]
+        for k in expired:
+            del self._seen[k]
+        if len(self._seen) >= self.max_keys:
+            self._seen.clear()
+
+
+def setup_logging(
+    log_filename="trading_bot.log",
+    json_logs=True,
+    max_bytes=10 * 1024 * 1024,
+    backup_count=5,
+    rotate_seconds=24 * 60 * 60,
+    rate_limit_seconds=10.0,
+):
+    """
+    Configures file and console logging for the bot and ib_insync.
+
+    Callers only ever enqueue records through a QueueHandler; a background
+    QueueListener does the formatting and the disk/console I/O, so logging
+    from IB event callbacks never blocks the event loop.
+    """
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
 
     if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        formatter = logging.Formatter(
+            "[%(asctime)s] - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
+
+        file_handler = SizeAndTimeRotatingFileHandler(
+            log_filename, max_bytes, backup_count, rotate_seconds
+        )
+        file_handler.setFormatter(JsonFormatter() if json_logs else formatter)
+
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(rate_limit_seconds))
+
+        listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        listener.start()
+        # Flush whatever is still queued when the process exits
+        atexit.register(listener.stop)
+
+        logger.addHandler(queue_handler)
 
     logging.getLogger("ib_insync").setLevel(logging.WARNING)
 